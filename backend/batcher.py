@@ -0,0 +1,110 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+
+class _Batch:
+    __slots__ = ("items", "futures", "run", "timer", "task")
+
+    def __init__(self, run: Callable[[list], Awaitable[dict]]):
+        self.items = []
+        self.futures = []
+        self.run = run
+        self.timer = None
+        self.task = None
+
+
+class MicroBatcher:
+    """Group compatible work items submitted close together into one batch call.
+
+    Items with the same batch key are collected until max_batch_size is reached
+    or linger_seconds have passed since the first one arrived, then
+    run(items) is called once and must return a dict mapping each item to its
+    result, or to an exception to raise for that item alone. Items missing from
+    that dict resolve to None. With max_batch_size 1 every item runs on its own
+    without waiting. A cancelled item is dropped from its batch, and a batch
+    that is already running is cancelled once none of its items are awaited.
+    """
+
+    def __init__(self, max_batch_size: int, linger_seconds: float):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.max_batch_size = max_batch_size
+        self.linger_seconds = linger_seconds
+        self._pending = {}
+        self._running = set()
+
+        self.items = 0
+        self.batches = 0
+        self.full_batches = 0
+
+    async def submit(self, batch_key: Hashable, item: Hashable, run: Callable[[list], Awaitable[dict]]):
+        """Add item to the open batch for batch_key and return its result once the batch has run"""
+        batch = self._pending.get(batch_key)
+        if batch is None:
+            batch = self._pending[batch_key] = _Batch(run)
+            if self.max_batch_size > 1:
+                batch.timer = asyncio.get_running_loop().call_later(self.linger_seconds, self._flush, batch_key)
+        future = asyncio.get_running_loop().create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        self.items += 1
+        if len(batch.items) >= self.max_batch_size:
+            self.full_batches += 1
+            self._flush(batch_key)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            self._abandon(batch_key, batch, future)
+            raise
+
+    def _abandon(self, batch_key: Hashable, batch: _Batch, future: asyncio.Future):
+        if batch.task is None:
+            # Still collecting: leave the batch, and close it if nothing else is in it
+            index = batch.futures.index(future)
+            del batch.items[index], batch.futures[index]
+            if not batch.items and self._pending.get(batch_key) is batch:
+                del self._pending[batch_key]
+                if batch.timer:
+                    batch.timer.cancel()
+        elif all(other.done() for other in batch.futures):
+            batch.task.cancel()
+
+    def _flush(self, batch_key: Hashable):
+        batch = self._pending.pop(batch_key, None)
+        if batch is None:
+            return
+        if batch.timer:
+            batch.timer.cancel()
+        self.batches += 1
+        task = batch.task = asyncio.ensure_future(self._run(batch))
+        # Keep a reference so the task is not garbage-collected mid-run
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: _Batch):
+        try:
+            results = await batch.run(batch.items)
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for item, future in zip(batch.items, batch.futures):
+            if future.done():
+                continue
+            result = results.get(item)
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "linger_seconds": self.linger_seconds,
+            "open_batches": len(self._pending),
+            "items": self.items,
+            "batches": self.batches,
+            "full_batches": self.full_batches,
+            "average_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import random
+import time
+from typing import Optional
+from urllib.parse import quote
+
+import httpx
+
+from metrics import BEDROCK_IN_FLIGHT, BEDROCK_REQUESTS_TOTAL, observe_stage
+
+# Error codes Bedrock uses when it wants the caller to slow down
+THROTTLING_ERRORS = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException", "ModelNotReadyException"}
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class BedrockError(Exception):
+    """Error returned by the bedrock-runtime API, formatted like botocore's ClientError"""
+
+    def __init__(self, status_code: int, code: str, message: str):
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+        super().__init__(f"An error occurred ({code}) when calling the InvokeModel operation: {message}")
+
+    @property
+    def throttled(self) -> bool:
+        return self.code in THROTTLING_ERRORS or self.status_code == 429
+
+    @property
+    def retryable(self) -> bool:
+        return self.throttled or self.status_code in RETRYABLE_STATUS_CODES
+
+
+class AdaptiveRateLimiter:
+    """Client-side token bucket whose rate backs off when Bedrock throttles us (AIMD)"""
+
+    def __init__(self, max_rate: float, min_rate: float = 0.5, increase_step: float = 0.5, decrease_factor: float = 0.5, cooldown: float = 1.0):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+
+        self.rate = max_rate
+        self._tokens = max_rate
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = asyncio.Lock()
+        self.throttle_events = 0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self):
+        self.throttle_events += 1
+        now = time.monotonic()
+        # Many in-flight calls see the same throttling burst, so only back off once per cooldown
+        if now - self._last_decrease >= self.cooldown:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = min(self._tokens, self.rate)
+            self._last_decrease = now
+
+
+def _load_credentials():
+    # botocore is slow to import and the credential chain may call the instance metadata
+    # service, so both wait until credentials are first needed
+    from botocore.session import get_session
+    return get_session().get_credentials()
+
+
+class AsyncBedrockClient:
+    """Minimal async bedrock-runtime client: SigV4-signed InvokeModel over a pooled httpx connection.
+
+    Credentials and the connection pool are set up on first use, so creating
+    the client is free; warm_up() does both ahead of the first request.
+    """
+
+    def __init__(
+        self,
+        region: str,
+        endpoint_url: Optional[str] = None,
+        max_connections: int = 10,
+        max_retries: int = 4,
+        base_delay: float = 0.25,
+        max_delay: float = 8.0,
+        max_rate: float = 20.0,
+        timeout: float = 120.0,
+        keepalive_expiry: float = 60.0,
+    ):
+        self.region = region
+        self.endpoint_url = (endpoint_url or f"https://bedrock-runtime.{region}.amazonaws.com").rstrip("/")
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_limiter = AdaptiveRateLimiter(max_rate)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.keepalive_expiry = keepalive_expiry
+        self._credentials = None
+        self._credentials_loaded = False
+        self._credentials_lock = asyncio.Lock()
+        self._client = None
+
+        self.requests = 0
+        self.retries = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=self.timeout,
+            )
+        return self._client
+
+    async def _get_credentials(self):
+        if not self._credentials_loaded:
+            async with self._credentials_lock:
+                if not self._credentials_loaded:
+                    # Resolved in a thread: the metadata service lookup can block for seconds
+                    self._credentials = await asyncio.to_thread(_load_credentials)
+                    self._credentials_loaded = True
+        return self._credentials
+
+    def _signed_headers(self, credentials, url: str, body: bytes, content_type: str, accept: str) -> dict:
+        headers = {"Content-Type": content_type, "Accept": accept}
+        if credentials is None:
+            # No credentials configured, e.g. when talking to a local stub server
+            return headers
+        from botocore.auth import SigV4Auth
+        from botocore.awsrequest import AWSRequest
+        request = AWSRequest(method="POST", url=url, data=body, headers=headers)
+        SigV4Auth(credentials.get_frozen_credentials(), "bedrock", self.region).add_auth(request)
+        return dict(request.headers.items())
+
+    async def warm_up(self, connections: int = 1) -> dict:
+        """Resolve credentials and open pooled connections to the endpoint before the first request"""
+        credentials = await self._get_credentials()
+        client = self._get_client()
+
+        async def connect():
+            # Any answer will do: the point is the DNS lookup and TLS handshake, and a connection left in the pool
+            await client.get(self.endpoint_url + "/", timeout=10.0)
+
+        results = await asyncio.gather(*[connect() for _ in range(min(connections, self.max_connections))], return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        return {
+            "credentials": credentials is not None,
+            "connections": len(results) - len(errors),
+            "error": str(errors[0]) if errors else None,
+        }
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying clients from synchronizing into waves
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def invoke_model(self, model_id: str, body: str, content_type: str = "application/json", accept: str = "application/json", max_retries: Optional[int] = None) -> dict:
+        """Invoke a model and return the decoded JSON response body.
+
+        max_retries overrides the client default, e.g. to fail over to another model sooner.
+        """
+        if max_retries is None:
+            max_retries = self.max_retries
+        url = f"{self.endpoint_url}/model/{quote(model_id, safe='')}/invoke"
+        payload = body.encode("utf-8") if isinstance(body, str) else body
+        credentials = await self._get_credentials()
+        client = self._get_client()
+
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire()
+            self.requests += 1
+            started = time.perf_counter()
+            BEDROCK_IN_FLIGHT.inc()
+            try:
+                response = await client.post(url, content=payload, headers=self._signed_headers(credentials, url, payload, content_type, accept))
+            except httpx.TransportError as e:
+                BEDROCK_REQUESTS_TOTAL.labels("transport_error").inc()
+                error = e
+                retryable, throttled = True, False
+            else:
+                observe_stage("bedrock_request", time.perf_counter() - started)
+                if response.status_code < 400:
+                    BEDROCK_REQUESTS_TOTAL.labels("success").inc()
+                    self.rate_limiter.on_success()
+                    parse_started = time.perf_counter()
+                    body = response.json()
+                    observe_stage("response_parse", time.perf_counter() - parse_started)
+                    return body
+                error = _error_from_response(response)
+                retryable, throttled = error.retryable, error.throttled
+                BEDROCK_REQUESTS_TOTAL.labels("throttled" if throttled else "error").inc()
+            finally:
+                BEDROCK_IN_FLIGHT.dec()
+
+            if throttled:
+                self.rate_limiter.on_throttle()
+            if not retryable or attempt >= max_retries:
+                raise error
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+            self.retries += 1
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "endpoint_url": self.endpoint_url,
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttle_events": self.rate_limiter.throttle_events,
+            "rate_limit_per_second": self.rate_limiter.rate,
+        }
+
+
+def _error_from_response(response: httpx.Response) -> BedrockError:
+    # x-amzn-ErrorType looks like "ValidationException:http://internal.amazon.com/..."
+    code = response.headers.get("x-amzn-ErrorType", "").split(":")[0]
+    try:
+        data = response.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        data = {}
+    if not code:
+        code = data.get("__type", "").split("#")[-1] or f"HTTP{response.status_code}"
+    message = data.get("message") or data.get("Message") or response.text
+    return BedrockError(response.status_code, code, message)
@@ -0,0 +1,299 @@
+"""Offline load test for the backend against the local Bedrock stand-in.
+
+Starts stub_bedrock.py and the API server as separate processes, drives
+/generate-images, /generate-video and /video-status at a fixed concurrency and
+reports latency percentiles, throughput, the server's peak RSS and event-loop lag:
+
+    python benchmark.py --concurrency 16 --image-requests 200 --num-images 4 \\
+        --video-requests 10 --latency 2 --latency-dist lognormal --throttle-rate 0.05
+
+Use --json to write the results to a file so runs can be compared.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+STATS_PATH = "/__benchmark__/stats"
+
+
+def percentile(sorted_samples: list, fraction: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def summarize(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50": percentile(ordered, 0.50),
+        "p95": percentile(ordered, 0.95),
+        "p99": percentile(ordered, 0.99),
+        "max": ordered[-1] if ordered else 0.0,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_app(port: int, lag_interval: float):
+    """Run the API in this process with an event-loop lag probe and a stats endpoint for the harness"""
+    import uvicorn
+
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+
+    lag_samples = deque(maxlen=100000)
+
+    async def probe_loop_lag():
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(lag_interval)
+            lag_samples.append(max(0.0, loop.time() - started - lag_interval))
+
+    @main.app.get(STATS_PATH, include_in_schema=False)
+    async def benchmark_stats():
+        return {
+            # ru_maxrss is in KiB on Linux
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "loop_lag_seconds": summarize(list(lag_samples)),
+        }
+
+    async def run():
+        server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+        probe = asyncio.create_task(probe_loop_lag())
+        try:
+            await server.serve()
+        finally:
+            probe.cancel()
+
+    asyncio.run(run())
+
+
+async def wait_until_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+class LoadRunner:
+    def __init__(self, base_url: str, args):
+        self.base_url = base_url
+        self.args = args
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.response_bytes = defaultdict(int)
+
+    def record(self, label: str, started: float, response: httpx.Response = None, error: bool = False):
+        self.latencies[label].append(time.perf_counter() - started)
+        if response is not None:
+            self.response_bytes[label] += len(response.content)
+        if error or (response is not None and response.status_code >= 400):
+            self.errors[label] += 1
+
+    async def _timed(self, client: httpx.AsyncClient, label: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            self.record(label, started, error=True)
+            return None
+        self.record(label, started, response)
+        return response
+
+    async def image_request(self, client: httpx.AsyncClient, index: int):
+        prompt = "benchmark prompt" if self.args.repeat_prompt else f"benchmark prompt {index}"
+        await self._timed(client, "POST /generate-images", "POST", "/generate-images", json={
+            "prompt": prompt,
+            "num_images": self.args.num_images,
+            "platform": random.choice(["web", "mobile", "desktop"]),
+            "response_format": self.args.response_format,
+            "quality": self.args.quality,
+        })
+
+    async def video_job(self, client: httpx.AsyncClient, index: int):
+        started = time.perf_counter()
+        response = await self._timed(client, "POST /generate-video", "POST", "/generate-video", json={
+            "prompt": f"benchmark video {index}",
+            "duration": self.args.duration,
+            "response_format": self.args.response_format,
+            "interpolation": self.args.interpolation,
+            "keyframes": self.args.keyframes,
+        })
+        if response is None or response.status_code != 200:
+            return
+        job_id = response.json()["job_id"]
+        while True:
+            await asyncio.sleep(self.args.poll_interval)
+            status = await self._timed(client, "GET /video-status", "GET", f"/video-status/{job_id}")
+            if status is None or status.status_code != 200:
+                self.record("video job end-to-end", started, error=True)
+                return
+            state = status.json()["status"]
+            if state in ("completed", "failed", "cancelled"):
+                self.record("video job end-to-end", started, error=state != "completed")
+                return
+
+    async def run(self) -> float:
+        operations = [("image", i) for i in range(self.args.image_requests)]
+        operations += [("video", i) for i in range(self.args.video_requests)]
+        random.Random(0).shuffle(operations)
+        queue = asyncio.Queue()
+        for operation in operations:
+            queue.put_nowait(operation)
+
+        limits = httpx.Limits(max_connections=self.args.concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=self.args.timeout) as client:
+            async def worker():
+                while not queue.empty():
+                    kind, index = queue.get_nowait()
+                    if kind == "image":
+                        await self.image_request(client, index)
+                    else:
+                        await self.video_job(client, index)
+
+            started = time.perf_counter()
+            await asyncio.gather(*[worker() for _ in range(self.args.concurrency)])
+            return time.perf_counter() - started
+
+
+def print_report(results: dict):
+    print(f"\nWall time: {results['wall_seconds']:.2f}s with concurrency {results['concurrency']}")
+    print(f"\n{'operation':<24} {'count':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'KiB/resp':>9}")
+    for label, stats in results["operations"].items():
+        print(
+            f"{label:<24} {stats['count']:>6} {stats['errors']:>6} {stats['throughput']:>8.2f} "
+            f"{stats['p50'] * 1000:>9.1f} {stats['p95'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f} "
+            f"{stats['avg_response_kib']:>9.1f}"
+        )
+    server = results["server"]
+    lag = server["loop_lag_seconds"]
+    print(f"\nServer peak RSS: {server['peak_rss_mb']:.1f} MiB")
+    print(f"Event-loop lag: p50 {lag['p50'] * 1000:.1f} ms, p99 {lag['p99'] * 1000:.1f} ms, max {lag['max'] * 1000:.1f} ms")
+
+
+async def benchmark(args) -> dict:
+    stub_port = free_port()
+    app_port = free_port()
+    workdir = tempfile.mkdtemp(prefix="benchmark-")
+
+    stub_command = [
+        sys.executable, os.path.join(BACKEND_DIR, "stub_bedrock.py"),
+        "--port", str(stub_port),
+        "--latency", str(args.latency),
+        "--latency-dist", args.latency_dist,
+        "--latency-jitter", str(args.latency_jitter),
+        "--throttle-rate", str(args.throttle_rate),
+        "--error-rate", str(args.error_rate),
+    ]
+    if args.artifact_size:
+        stub_command += ["--artifact-size", args.artifact_size]
+
+    env = {
+        **os.environ,
+        "BEDROCK_ENDPOINT_URL": f"http://127.0.0.1:{stub_port}",
+        "IMAGE_CACHE_ENABLED": "true" if args.cache else "false",
+        "IMAGE_CACHE_DIR": os.path.join(workdir, "cache"),
+        "IMAGE_STORE_DIR": os.path.join(workdir, "images"),
+        "VIDEO_JOB_DB": os.path.join(workdir, "jobs.sqlite3"),
+        # The load generator is a single client, so per-client limits would only measure themselves
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    stub = subprocess.Popen(stub_command, stdout=subprocess.DEVNULL)
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(app_port), "--lag-interval", str(args.lag_interval)],
+        env=env,
+        stdout=subprocess.DEVNULL if args.quiet_server else None,
+        stderr=subprocess.DEVNULL if args.quiet_server else None,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{app_port}"
+        await wait_until_ready(base_url + STATS_PATH)
+
+        runner = LoadRunner(base_url, args)
+        wall = await runner.run()
+
+        async with httpx.AsyncClient() as client:
+            server_stats = (await client.get(base_url + STATS_PATH)).json()
+    finally:
+        server.terminate()
+        stub.terminate()
+        server.wait()
+        stub.wait()
+
+    operations = {}
+    for label, samples in runner.latencies.items():
+        stats = summarize(samples)
+        stats["errors"] = runner.errors[label]
+        stats["throughput"] = stats["count"] / wall if wall else 0.0
+        stats["avg_response_kib"] = runner.response_bytes[label] / max(1, stats["count"]) / 1024
+        operations[label] = stats
+
+    return {
+        "concurrency": args.concurrency,
+        "wall_seconds": wall,
+        "operations": operations,
+        "server": server_stats,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test against a local Bedrock stand-in")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent client operations")
+    parser.add_argument("--image-requests", type=int, default=50)
+    parser.add_argument("--num-images", type=int, default=4)
+    parser.add_argument("--video-requests", type=int, default=4)
+    parser.add_argument("--duration", type=int, default=3, help="Video duration in seconds")
+    parser.add_argument("--interpolation", choices=["none", "crossfade", "flow"], default="none", help="Render video frames between keyframes locally")
+    parser.add_argument("--keyframes", type=int, default=6, help="Keyframes per video with --interpolation")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between /video-status polls")
+    parser.add_argument("--response-format", choices=["base64", "url"], default="base64")
+    parser.add_argument("--quality", choices=["full", "preview"], default="full", help="Image quality tier to request")
+    parser.add_argument("--repeat-prompt", action="store_true", help="Reuse one prompt so caching and coalescing apply")
+    parser.add_argument("--cache", action="store_true", help="Leave the image cache enabled")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--latency", type=float, default=0.5, help="Mean stub latency in seconds")
+    parser.add_argument("--latency-dist", default="lognormal", choices=["fixed", "uniform", "exponential", "lognormal"])
+    parser.add_argument("--latency-jitter", type=float, default=0.4)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--artifact-size", help="Return realistic noise PNGs of this size, e.g. 1024x1024")
+    parser.add_argument("--lag-interval", type=float, default=0.05, help="Event-loop lag probe interval")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--quiet-server", action="store_true", help="Hide the server's log output")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve_app(args.port, args.lag_interval)
+        sys.exit(0)
+
+    results = asyncio.run(benchmark(args))
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
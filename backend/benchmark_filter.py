@@ -0,0 +1,56 @@
+"""Micro-benchmark for the prompt content filter.
+
+Compares the compiled Aho-Corasick filter with the previous approach of testing
+every word against every listed term, for growing wordlist sizes:
+
+    python benchmark_filter.py --sizes 16 1000 5000 --prompt-words 150
+"""
+import argparse
+import random
+import string
+import time
+
+from content_filter import FilterEngine
+
+
+def random_term(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+
+
+def naive_check(prompt: str, terms: list) -> list:
+    words = prompt.lower().split()
+    return [word for word in words if any(term in word for term in terms)]
+
+
+def time_per_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(sizes: list, prompt_words: int, repeat: int):
+    rng = random.Random(0)
+    prompt = " ".join(random_term(rng) for _ in range(prompt_words))
+    print(f"Prompt: {prompt_words} words, {len(prompt)} characters, {repeat} iterations per measurement\n")
+    print(f"{'terms':>8} {'build ms':>10} {'compiled us':>12} {'naive us':>10} {'speedup':>8}")
+
+    for size in sizes:
+        terms = [random_term(rng) for _ in range(size)]
+
+        start = time.perf_counter()
+        engine = FilterEngine([(term, "benchmark", "high") for term in terms])
+        build_ms = (time.perf_counter() - start) * 1000
+
+        compiled = time_per_call(lambda: engine.scan(prompt), repeat)
+        naive = time_per_call(lambda: naive_check(prompt, terms), repeat)
+        print(f"{size:>8} {build_ms:>10.1f} {compiled * 1e6:>12.1f} {naive * 1e6:>10.1f} {naive / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the prompt content filter")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 100, 1000, 5000, 20000])
+    parser.add_argument("--prompt-words", type=int, default=150, help="Words in the synthetic prompt (1000 characters is the API limit)")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.sizes, args.prompt_words, args.repeat)
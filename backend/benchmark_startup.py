@@ -0,0 +1,126 @@
+"""Cold-start benchmark for the API server.
+
+Starts stub_bedrock.py, then launches the server in a fresh process several
+times and measures, from the moment the process is started:
+
+- import: importing main (measured in a separate interpreter)
+- first_response: the first HTTP response of any kind
+- ready: GET /ready reporting the backend as warm
+- first_image: the first /generate-images response, generated through the stub
+
+    python benchmark_startup.py --runs 5 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmark import BACKEND_DIR, free_port
+
+IMPORT_SNIPPET = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+
+
+def wait_for(check, timeout: float) -> float:
+    """Poll check() until it returns True and return when that happened, in perf_counter time"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if check():
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError("Server did not start in time")
+
+
+def measure_import(env: dict) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def measure_start(env: dict, timeout: float) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=timeout) as client:
+            first_response = wait_for(lambda: client.get(base_url + "/ready") is not None, timeout)
+            # Servers without /ready (404) count as ready as soon as they answer
+            ready = wait_for(lambda: client.get(base_url + "/ready").status_code != 503, timeout)
+            response = client.post(base_url + "/generate-images", json={"prompt": "startup benchmark", "num_images": 1, "use_cache": False})
+            response.raise_for_status()
+            first_image = time.perf_counter()
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "first_response": first_response - started,
+        "ready": ready - started,
+        "first_image": first_image - started,
+    }
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub latency per Bedrock call in seconds")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="startup-benchmark-")
+    stub_port = free_port()
+    env = {
+        **os.environ,
+        "BEDROCK_ENDPOINT_URL": f"http://127.0.0.1:{stub_port}",
+        "IMAGE_CACHE_ENABLED": "false",
+        "IMAGE_CACHE_DIR": os.path.join(workdir, "cache"),
+        "IMAGE_STORE_DIR": os.path.join(workdir, "images"),
+        "VIDEO_JOB_DB": os.path.join(workdir, "jobs.sqlite3"),
+        "RATE_LIMIT_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+    }
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "stub_bedrock.py"), "--port", str(stub_port), "--latency", str(args.latency), "--artifact-size", "64x64"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(lambda: httpx.get(f"http://127.0.0.1:{stub_port}/") is not None, args.timeout)
+        runs = [{"import": measure_import(env), **measure_start(env, args.timeout)} for _ in range(args.runs)]
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    results = {metric: summarize([run[metric] for run in runs]) for metric in runs[0]}
+    print(f"{'seconds':<16}{'median':>10}{'min':>10}{'max':>10}")
+    for metric, summary in results.items():
+        print(f"{metric:<16}{summary['median']:>10.3f}{summary['min']:>10.3f}{summary['max']:>10.3f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": runs, "summary": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import zipfile
+from typing import Optional
+
+from image_store import write_atomic
+
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f-]{36}$")
+RESULTS_FILE = "results.jsonl"
+ARCHIVE_FILE = "images.zip"
+OUTPUT_MODES = ("files", "zip")
+
+
+def parse_bulk_items(content: bytes) -> list:
+    """Parse an uploaded prompt list: a JSON array, or JSON Lines with one object per line"""
+    text = content.decode("utf-8-sig").strip()
+    if text.startswith("["):
+        try:
+            items = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+    else:
+        items = []
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {number}: {e}")
+    for number, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f"Item {number} must be an object with at least a prompt")
+    return items
+
+
+class BulkOutput:
+    """Results of one bulk job, written to disk as they are generated.
+
+    Each image becomes a PNG named after its item and seed, either as a
+    separate file or as a member of one zip archive. Every image, failure and
+    rejected item is also appended to ``results.jsonl``, so partial results
+    can be read while the job runs. The zip archive is only complete once
+    ``close()`` has run.
+    """
+
+    def __init__(self, directory: str, mode: str = "files"):
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown bulk output mode: {mode}")
+        self.directory = directory
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._archive = None
+
+    def path(self, filename: str) -> Optional[str]:
+        """Return the path of an output file, or None if the name does not refer to one"""
+        if os.path.basename(filename) != filename or filename.startswith("."):
+            return None
+        path = os.path.join(self.directory, filename)
+        return path if os.path.isfile(path) else None
+
+    def write_image(self, item: int, seed: int, data: bytes) -> str:
+        filename = f"item-{item:05d}-seed-{seed}.png"
+        if self.mode == "zip":
+            with self._lock:
+                self._open_archive()
+                self._archive.writestr(filename, data)
+        else:
+            write_atomic(os.path.join(self.directory, filename), data)
+        return filename
+
+    def _open_archive(self):
+        if self._archive is None:
+            os.makedirs(self.directory, exist_ok=True)
+            # PNGs are already compressed, so members are stored as they are
+            self._archive = zipfile.ZipFile(os.path.join(self.directory, ARCHIVE_FILE + ".partial"), "w", zipfile.ZIP_STORED)
+
+    def append_result(self, entry: dict):
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, RESULTS_FILE), "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def read_results(self, start: int = 0, end: Optional[int] = None) -> list:
+        """Return result entries start <= n < end, in the order they were written"""
+        try:
+            with open(os.path.join(self.directory, RESULTS_FILE), encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        # A line still being written by another worker is skipped until it is complete
+        return [json.loads(line) for line in lines[start:end] if line.endswith("\n")]
+
+    def close(self):
+        """Finish the archive, adding the results manifest to it"""
+        with self._lock:
+            if self.mode != "zip":
+                return
+            self._open_archive()
+            results = os.path.join(self.directory, RESULTS_FILE)
+            if os.path.exists(results):
+                self._archive.write(results, RESULTS_FILE)
+            self._archive.close()
+            self._archive = None
+            os.replace(os.path.join(self.directory, ARCHIVE_FILE + ".partial"), os.path.join(self.directory, ARCHIVE_FILE))
+
+    def abort(self):
+        with self._lock:
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
+
+    def delete(self):
+        self.abort()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def cleanup_outputs(directory: str, max_age_seconds: int) -> int:
+    """Delete job output directories that have not been written to within max_age_seconds"""
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if not os.path.isdir(path):
+                continue
+            # Appending to a file does not touch the directory, so look at the newest file as well
+            newest = max([os.path.getmtime(path)] + [entry.stat().st_mtime for entry in os.scandir(path)])
+            if newest < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Temporary files older than this were left behind by a process that died mid-write
+STALE_TMP_SECONDS = 3600
+
+
+def cache_key(model_id: str, request_body: dict) -> str:
+    """Build a content address for a generation request from its canonical JSON body"""
+    canonical = json.dumps(
+        {"model_id": model_id, "body": request_body},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ImageCache:
+    """Two-tier cache of decoded images: an in-memory LRU bounded by bytes and a PNG directory on disk"""
+
+    def __init__(self, directory: str, max_memory_bytes: int, ttl_seconds: int, enabled: bool = True, max_disk_bytes: int = 0):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        # 0 leaves the disk tier bounded by the TTL alone
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        # Size of the disk tier as of the last cleanup()
+        self.disk_bytes = 0
+
+        # key -> (png bytes, time stored)
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _path(self, key: str) -> str:
+        # Shard by key prefix so a single directory never holds every image
+        return os.path.join(self.directory, key[:2], f"{key}.png")
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - stored_at > self.ttl_seconds
+
+    def _remember(self, key: str, data: bytes, stored_at: float):
+        # Caller must hold the lock
+        if len(data) > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key)[0])
+        self._memory[key] = (data, stored_at)
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached PNG bytes for key, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                data, stored_at = entry
+                if not self._expired(stored_at):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return data
+                del self._memory[key]
+                self._memory_bytes -= len(data)
+                self.expirations += 1
+
+        path = self._path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if self._expired(stored_at):
+                os.remove(path)
+                with self._lock:
+                    self.expirations += 1
+                    self.misses += 1
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self._remember(key, data, stored_at)
+            self.hits += 1
+            self.disk_hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Store PNG bytes under key in both tiers"""
+        if not self.enabled:
+            return
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see a partial PNG
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._remember(key, data, time.time())
+
+    def cleanup(self) -> int:
+        """Delete expired disk entries, then the oldest ones until the disk tier fits in max_disk_bytes"""
+        now = time.time()
+        entries = []
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stored_at = os.path.getmtime(path)
+                    if name.endswith(".tmp"):
+                        if now - stored_at > STALE_TMP_SECONDS:
+                            os.remove(path)
+                        continue
+                    if self._expired(stored_at):
+                        os.remove(path)
+                        removed += 1
+                        with self._lock:
+                            self.expirations += 1
+                        continue
+                    entries.append((stored_at, os.path.getsize(path), path))
+                except FileNotFoundError:
+                    pass
+
+        total = sum(size for _, size, _ in entries)
+        if self.max_disk_bytes > 0 and total > self.max_disk_bytes:
+            # Oldest first; entries are never refreshed, so this is also the order they would expire in
+            for _, size, path in sorted(entries):
+                if total <= self.max_disk_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+                with self._lock:
+                    self.evictions += 1
+        self.disk_bytes = total
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "disk_bytes": self.disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "ttl_seconds": self.ttl_seconds,
+            }
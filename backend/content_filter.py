@@ -0,0 +1,206 @@
+import logging
+import os
+import threading
+import time
+import unicodedata
+from collections import deque
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+SEVERITIES = {"low": 1, "medium": 2, "high": 3}
+
+# Characters commonly substituted for letters to slip past word filters
+LEETSPEAK = {
+    "0": "o",
+    "1": "i",
+    "3": "e",
+    "4": "a",
+    "5": "s",
+    "7": "t",
+    "@": "a",
+    "$": "s",
+    "!": "i",
+}
+LEETSPEAK_TABLE = str.maketrans(LEETSPEAK)
+
+
+class Match(NamedTuple):
+    term: str
+    category: str
+    severity: str
+    start: int  # span in the original prompt, end exclusive
+    end: int
+    word: str  # the whitespace-delimited word containing the match
+
+
+def normalize(text: str):
+    """Fold text for matching and return it with a map from each folded character to its source index.
+
+    Applies NFKD decomposition, drops combining marks (so accents do not hide
+    a term), casefolds and undoes common leetspeak substitutions.
+    """
+    if text.isascii():
+        # Fast path: folding is one character in, one character out
+        return text.lower().translate(LEETSPEAK_TABLE), range(len(text))
+
+    folded = []
+    positions = []
+    for index, char in enumerate(text):
+        for part in unicodedata.normalize("NFKD", char):
+            if unicodedata.combining(part):
+                continue
+            for lowered in part.casefold():
+                folded.append(LEETSPEAK.get(lowered, lowered))
+                positions.append(index)
+    return "".join(folded), positions
+
+
+class FilterEngine:
+    """Aho-Corasick automaton over the folded wordlist: one pass over the prompt finds every term"""
+
+    def __init__(self, entries: list):
+        # State 0 is the root. goto[state] maps a character to the next state.
+        self._goto = [{}]
+        self._fail = [0]
+        # Terms ending at each state, including those reached through failure links
+        self._outputs = [[]]
+        self.size = 0
+
+        for term, category, severity in entries:
+            folded, _ = normalize(term)
+            if not folded:
+                continue
+            state = 0
+            for char in folded:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._outputs.append([])
+                state = next_state
+            self._outputs[state].append((len(folded), term, category, severity))
+            self.size += 1
+
+        # Breadth-first pass to compute failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def scan(self, text: str) -> list:
+        """Return every occurrence of a listed term in text, with spans into the original string"""
+        folded, positions = normalize(text)
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        matches = []
+        state = 0
+        for index, char in enumerate(folded):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, term, category, severity in outputs[state]:
+                start = positions[index - length + 1]
+                end = positions[index] + 1
+                matches.append(Match(term, category, severity, start, end, _word_at(text, start, end)))
+        return matches
+
+
+def _word_at(text: str, start: int, end: int) -> str:
+    while start > 0 and not text[start - 1].isspace():
+        start -= 1
+    while end < len(text) and not text[end].isspace():
+        end += 1
+    return text[start:end]
+
+
+def load_wordlist(path: str) -> list:
+    """Read "term,category,severity" lines; blank lines and lines starting with # are ignored"""
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = [part.strip() for part in line.split(",")]
+            term = parts[0]
+            category = parts[1] if len(parts) > 1 and parts[1] else "general"
+            severity = parts[2] if len(parts) > 2 and parts[2] else "high"
+            if severity not in SEVERITIES:
+                raise ValueError(f"{path}:{line_number}: unknown severity '{severity}'")
+            entries.append((term, category, severity))
+    return entries
+
+
+class ContentFilter:
+    """Prompt filter built from a wordlist file, rebuilt automatically when the file changes.
+
+    The wordlist is compiled on first use, or earlier with load(), so creating
+    the filter costs nothing at import time.
+    """
+
+    def __init__(self, path: str, block_severity: str = "low", reload_interval: float = 5.0):
+        if block_severity not in SEVERITIES:
+            raise ValueError(f"Unknown severity: {block_severity}")
+        self.path = path
+        self.block_level = SEVERITIES[block_severity]
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self.engine = None
+
+    def _build(self) -> FilterEngine:
+        mtime = os.path.getmtime(self.path)
+        engine = FilterEngine(load_wordlist(self.path))
+        self._mtime = mtime
+        return engine
+
+    def load(self) -> FilterEngine:
+        """Compile the wordlist now if that has not happened yet"""
+        if self.engine is None:
+            with self._lock:
+                if self.engine is None:
+                    self.engine = self._build()
+                    self._checked_at = time.monotonic()
+        return self.engine
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = now
+            try:
+                if os.path.getmtime(self.path) != self._mtime:
+                    # Swap in the new automaton only once it is fully built
+                    self.engine = self._build()
+                    logger.info("Reloaded content filter with %d terms from %s", self.engine.size, self.path)
+            except Exception as e:
+                # Keep filtering with the previous list rather than failing open
+                logger.error("Error reloading content filter: %s", e)
+
+    def scan(self, prompt: str) -> list:
+        if self.engine is None:
+            self.load()
+        else:
+            self._maybe_reload()
+        return self.engine.scan(prompt)
+
+    def blocked(self, prompt: str, matches: Optional[list] = None) -> list:
+        """Return the matches severe enough to reject the prompt"""
+        if matches is None:
+            matches = self.scan(prompt)
+        return [match for match in matches if SEVERITIES[match.severity] >= self.block_level]
@@ -0,0 +1,129 @@
+import io
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, without it every video frame is generated by the model
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional as well, frames are decoded with it
+    Image = None
+
+INTERPOLATION_METHODS = ("none", "crossfade", "flow")
+
+# Motion is estimated on a copy downscaled by FLOW_SCALE, matching FLOW_BLOCK-pixel blocks within
+# FLOW_RADIUS pixels there (32px blocks and up to 24px of motion per gap at full size with the defaults)
+FLOW_SCALE = 4
+FLOW_BLOCK = 8
+FLOW_RADIUS = 6
+# Extra matching cost per pixel of motion, so flat areas where every shift matches stay still
+FLOW_MOTION_PENALTY = 0.5
+LUMA_WEIGHTS = (0.299, 0.587, 0.114)
+
+def available_methods() -> list:
+    if np is None or Image is None:
+        return ["none"]
+    return list(INTERPOLATION_METHODS)
+
+
+def keyframe_indices(num_frames: int, num_keyframes: int) -> list:
+    """Evenly spaced frames to generate with the model, always including the first and the last"""
+    if num_frames <= 2:
+        return list(range(num_frames))
+    count = max(2, min(num_keyframes, num_frames))
+    return sorted({round(i * (num_frames - 1) / (count - 1)) for i in range(count)})
+
+
+def _load(path: str, size: tuple = None) -> "np.ndarray":
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        if size and image.size != size:
+            # A failover to another model can return keyframes of a slightly different size
+            image = image.resize(size, Image.LANCZOS)
+        return np.asarray(image, dtype=np.float32)
+
+
+def _to_png(pixels: "np.ndarray") -> bytes:
+    output = io.BytesIO()
+    # Fastest compression: about 4x quicker to encode than the default for files under a fifth larger
+    Image.fromarray(np.clip(pixels + 0.5, 0, 255).astype(np.uint8)).save(output, format="PNG", compress_level=1)
+    return output.getvalue()
+
+
+def _downscale(gray: "np.ndarray", factor: int) -> "np.ndarray":
+    height, width = gray.shape[0] // factor * factor, gray.shape[1] // factor * factor
+    return gray[:height, :width].reshape(height // factor, factor, width // factor, factor).mean(axis=(1, 3))
+
+
+def estimate_flow(start: "np.ndarray", end: "np.ndarray") -> "np.ndarray":
+    """Block-matching optical flow: an HxWx2 field of (dy, dx) with end[p + flow[p]] ~ start[p].
+
+    Every candidate shift is scored for all blocks at once, so the only
+    Python loop is over the (2 * FLOW_RADIUS + 1) ** 2 shifts.
+    """
+    height, width = start.shape[:2]
+    weights = np.asarray(LUMA_WEIGHTS, dtype=np.float32)
+    a = _downscale(start @ weights, FLOW_SCALE)
+    b = _downscale(end @ weights, FLOW_SCALE)
+    rows, cols = a.shape[0] // FLOW_BLOCK, a.shape[1] // FLOW_BLOCK
+    a = a[:rows * FLOW_BLOCK, :cols * FLOW_BLOCK]
+    padded = np.pad(b, FLOW_RADIUS, mode="edge")
+
+    best_cost = np.full((rows, cols), np.inf, dtype=np.float32)
+    best = np.zeros((rows, cols, 2), dtype=np.float32)
+    for dy in range(-FLOW_RADIUS, FLOW_RADIUS + 1):
+        for dx in range(-FLOW_RADIUS, FLOW_RADIUS + 1):
+            shifted = padded[FLOW_RADIUS + dy:FLOW_RADIUS + dy + a.shape[0], FLOW_RADIUS + dx:FLOW_RADIUS + dx + a.shape[1]]
+            cost = np.abs(a - shifted).reshape(rows, FLOW_BLOCK, cols, FLOW_BLOCK).sum(axis=(1, 3))
+            cost += (abs(dy) + abs(dx)) * FLOW_MOTION_PENALTY * FLOW_BLOCK * FLOW_BLOCK
+            better = cost < best_cost
+            best_cost[better] = cost[better]
+            best[better] = (dy, dx)
+
+    # Bilinear upsampling turns the per-block vectors into a smooth per-pixel field
+    return np.stack([
+        np.asarray(Image.fromarray(best[..., axis] * FLOW_SCALE, mode="F").resize((width, height), Image.BILINEAR))
+        for axis in range(2)
+    ], axis=-1)
+
+
+def _sample(image: "np.ndarray", y: "np.ndarray", x: "np.ndarray") -> "np.ndarray":
+    """Bilinear lookup of image at fractional coordinates, clamped to the edges"""
+    height, width = image.shape[:2]
+    y = np.clip(y, 0, height - 1)
+    x = np.clip(x, 0, width - 1)
+    y0 = np.floor(y)
+    x0 = np.floor(x)
+    wy = (y - y0)[..., None]
+    wx = (x - x0)[..., None]
+    # Gather from the flattened image with row offsets, which is cheaper than 2D fancy indexing
+    pixels = image.reshape(-1, image.shape[2])
+    row0 = y0.astype(np.int32) * width
+    row1 = np.minimum(y0.astype(np.int32) + 1, height - 1) * width
+    col0 = x0.astype(np.int32)
+    col1 = np.minimum(col0 + 1, width - 1)
+    top = pixels[row0 + col0] * (1 - wx) + pixels[row0 + col1] * wx
+    bottom = pixels[row1 + col0] * (1 - wx) + pixels[row1 + col1] * wx
+    return top * (1 - wy) + bottom * wy
+
+
+def interpolate_frames(start_path: str, end_path: str, positions: list, method: str) -> list:
+    """Render frames at positions 0 < t < 1 between two PNG files and return them as PNG bytes (runs in a worker process)"""
+    start = _load(start_path)
+    end = _load(end_path, (start.shape[1], start.shape[0]))
+    if method == "flow":
+        flow = estimate_flow(start, end)
+        ys, xs = np.mgrid[0:start.shape[0], 0:start.shape[1]].astype(np.float32)
+
+    frames = []
+    for t in positions:
+        if method == "flow":
+            # Carry the start frame forward and the end frame back along the motion, then blend them
+            from_start = _sample(start, ys - t * flow[..., 0], xs - t * flow[..., 1])
+            from_end = _sample(end, ys + (1 - t) * flow[..., 0], xs + (1 - t) * flow[..., 1])
+            pixels = from_start * (1 - t) + from_end * t
+        else:
+            pixels = start * (1 - t) + end * t
+        frames.append(_to_png(pixels))
+    return frames
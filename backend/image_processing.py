@@ -0,0 +1,120 @@
+import asyncio
+import io
+import os
+from typing import Optional
+
+from image_store import ImageStore, PIL_FORMATS, supported_formats, write_atomic
+from process_pool import ProcessPool
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional, only the original PNG can then be served
+    Image = None
+
+# Responsive sizes by maximum width; images are never scaled up
+VARIANT_WIDTHS = {
+    "thumb": 256,
+    "small": 512,
+    "medium": 768,
+    "full": None,
+}
+
+
+def render_variants(source_path: str, outputs: list):
+    """Decode source_path once and write each (path, max_width, fmt, quality) output (runs in a worker process)"""
+    with Image.open(source_path) as image:
+        base = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    # Drop text chunks, EXIF and ICC profiles; only pixels are carried over
+    base.info = {}
+    for path, max_width, fmt, quality in outputs:
+        variant = base
+        if max_width and base.width > max_width:
+            variant = base.resize((max_width, round(base.height * max_width / base.width)), Image.LANCZOS)
+        output = io.BytesIO()
+        if fmt == "png":
+            variant.save(output, format="PNG", optimize=True)
+        else:
+            variant.save(output, format=PIL_FORMATS[fmt], quality=quality)
+        write_atomic(path, output.getvalue())
+
+
+class ImageProcessor:
+    """Derive resized, re-encoded and metadata-free variants of stored images.
+
+    Variants are rendered in the shared process pool so decoding and encoding never run
+    on the event loop, and are written next to the original so each one is
+    only produced once. Concurrent requests for the same variant share one
+    render.
+    """
+
+    def __init__(self, store: ImageStore, pool: ProcessPool, webp_quality: int = 85, avif_quality: int = 60):
+        self.store = store
+        self.pool = pool
+        self.quality = {"png": None, "webp": webp_quality, "avif": avif_quality}
+        self._rendering = {}
+        self._running = set()
+        self.renders = 0
+        self.variants_rendered = 0
+
+    async def get_path(self, image_id: str, variant: str = "full", fmt: str = "png") -> Optional[str]:
+        """Return the file holding image_id as variant in fmt, rendering it on first use"""
+        if variant not in VARIANT_WIDTHS:
+            raise ValueError(f"Unknown image variant: {variant}. Available variants: {', '.join(VARIANT_WIDTHS)}")
+        if Image is None and variant != "full":
+            raise ValueError("Resized variants need Pillow to be installed")
+        if not self.store.exists(image_id):
+            return None
+        path = self.store.path(image_id, fmt, variant)
+        if not os.path.exists(path):
+            await self.render(image_id, [(variant, fmt)])
+        return path
+
+    async def render(self, image_id: str, specs: list):
+        """Render the missing (variant, fmt) pairs for an image with a single decode"""
+        waiting = []
+        outputs = []
+        for variant, fmt in specs:
+            path = self.store.path(image_id, fmt, variant)
+            if path in self._rendering:
+                waiting.append(self._rendering[path])
+            elif not os.path.exists(path):
+                outputs.append((path, VARIANT_WIDTHS[variant], fmt, self.quality[fmt]))
+
+        if outputs:
+            future = self.pool.submit(render_variants, self.store.path(image_id), outputs)
+            for path, *_ in outputs:
+                self._rendering[path] = future
+            self.renders += 1
+            try:
+                # Shielded so one caller going away does not abandon the render for the others
+                await asyncio.shield(future)
+                self.variants_rendered += len(outputs)
+            finally:
+                for path, *_ in outputs:
+                    self._rendering.pop(path, None)
+        if waiting:
+            await asyncio.gather(*[asyncio.shield(future) for future in waiting])
+
+    def prerender(self, image_id: str, specs: list):
+        """Start rendering variants in the background, e.g. thumbnails for a gallery that is about to load"""
+        available = supported_formats()
+        specs = [(variant, fmt) for variant, fmt in specs if fmt in available]
+        if not specs or Image is None:
+            return
+        task = asyncio.ensure_future(self.render(image_id, specs))
+        # Keep a reference so the task is not garbage-collected mid-run
+        self._running.add(task)
+        task.add_done_callback(self._finish_prerender)
+
+    def _finish_prerender(self, task: asyncio.Task):
+        self._running.discard(task)
+        # The variant is rendered again on request, so a failure here only needs retrieving
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "rendering": len(self._rendering),
+            "renders": self.renders,
+            "variants_rendered": self.variants_rendered,
+        }
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional, images are then only served as PNG
+    Image = None
+
+IMAGE_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "avif": "image/avif",
+    "mp4": "video/mp4",
+    "webm": "video/webm",
+}
+
+# Pillow format names used when transcoding
+PIL_FORMATS = {
+    "png": "PNG",
+    "webp": "WEBP",
+    "avif": "AVIF",
+}
+
+
+def supported_formats() -> list:
+    """Return the formats images can be served in, best compression first"""
+    formats = []
+    if Image is not None:
+        Image.init()
+        for fmt in ("avif", "webp"):
+            if PIL_FORMATS[fmt] in Image.SAVE:
+                formats.append(fmt)
+    formats.append("png")
+    return formats
+
+
+def negotiate_format(accept: str, requested: Optional[str] = None) -> str:
+    """Pick the output format from an explicit request or the client's Accept header"""
+    available = supported_formats()
+    if requested:
+        requested = requested.lower()
+        if requested not in available:
+            raise ValueError(f"Unsupported image format: {requested}. Available formats: {', '.join(available)}")
+        return requested
+    for fmt in available:
+        if CONTENT_TYPES[fmt] in accept:
+            return fmt
+    return "png"
+
+
+class ImageStore:
+    """Content-addressed store of decoded PNG images on disk.
+
+    Resized and transcoded variants (see image_processing.py) live next to the
+    original as ``{id}.{variant}.{fmt}``; the original size is ``{id}.{fmt}``.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, image_id: str, fmt: str = "png", variant: str = "full") -> str:
+        name = f"{image_id}.{fmt}" if variant == "full" else f"{image_id}.{variant}.{fmt}"
+        return os.path.join(self.directory, image_id[:2], name)
+
+    def put(self, data: bytes, fmt: str = "png") -> str:
+        """Store bytes (PNG unless fmt says otherwise) and return their ID, the SHA-256 of the content"""
+        image_id = hashlib.sha256(data).hexdigest()
+        path = self.path(image_id, fmt)
+        try:
+            # Refresh the timestamp so cleanup() measures age from the last use
+            os.utime(path)
+        except FileNotFoundError:
+            write_atomic(path, data)
+        return image_id
+
+    def read(self, image_id: str) -> Optional[bytes]:
+        try:
+            with open(self.path(image_id), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, image_id: str, fmt: str = "png") -> bool:
+        return bool(IMAGE_ID_PATTERN.match(image_id)) and os.path.exists(self.path(image_id, fmt))
+
+    def cleanup(self, max_age_seconds: int) -> int:
+        """Delete images (and their variants) not stored or re-stored within max_age_seconds"""
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+def write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
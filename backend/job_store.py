@@ -0,0 +1,406 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class JobStore:
+    """Interface for video job storage.
+
+    Jobs are plain dicts. Frames are kept separately by index and should be small
+    references (image store IDs and metadata) rather than image data.
+
+    Changes made through this process wake up local subscribers straight away;
+    subscribers should still re-check periodically to see changes made by other
+    workers sharing the same backend.
+
+    The store doubles as the work queue: a worker claims a queued or abandoned
+    job with a time-limited lease, renews the lease while it runs and releases
+    it when done. A job whose lease runs out (e.g. its worker died) can be
+    claimed again and resumed from the frames already stored.
+    """
+
+    def __init__(self):
+        # job_id -> events of the subscribers waiting for a change
+        self._subscribers = {}
+
+    def subscribe(self, job_id: str) -> asyncio.Event:
+        event = asyncio.Event()
+        self._subscribers.setdefault(job_id, set()).add(event)
+        return event
+
+    def unsubscribe(self, job_id: str, event: asyncio.Event):
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(event)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def _notify(self, job_id: str):
+        for event in self._subscribers.get(job_id, ()):
+            event.set()
+
+    async def create(self, job_id: str, job: dict):
+        raise NotImplementedError
+
+    async def get(self, job_id: str, include_frames: bool = True) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def update(self, job_id: str, **fields):
+        raise NotImplementedError
+
+    async def transition(self, job_id: str, from_statuses: tuple, **fields) -> bool:
+        """Update fields only if the job's status is one of from_statuses, checked and written atomically.
+
+        Returns False, changing nothing, when the job is gone or has moved on, e.g.
+        a worker finishing a job that was cancelled in the meantime.
+        """
+        raise NotImplementedError
+
+    async def add_frame(self, job_id: str, index: int, frame: dict):
+        raise NotImplementedError
+
+    async def get_frames(self, job_id: str, start: int = 0, end: Optional[int] = None) -> list:
+        """Return the stored frames with start <= index < end, in index order"""
+        raise NotImplementedError
+
+    async def delete(self, job_id: str) -> bool:
+        raise NotImplementedError
+
+    async def cleanup(self) -> int:
+        """Remove expired jobs and return how many were removed"""
+        raise NotImplementedError
+
+    async def count(self) -> int:
+        raise NotImplementedError
+
+    async def claim(self, worker_id: str, lease_seconds: float) -> Optional[dict]:
+        """Lease the oldest runnable job to worker_id and return it with its "id", or None if there is none"""
+        raise NotImplementedError
+
+    async def renew(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a lease; False means the job was cancelled, finished or taken over and the worker should stop"""
+        raise NotImplementedError
+
+    async def release(self, job_id: str, worker_id: str):
+        raise NotImplementedError
+
+
+# Statuses a worker may pick up; "processing" jobs are only picked up once their lease has expired
+RUNNABLE_STATUSES = ("queued", "processing")
+
+
+class MemoryJobStore(JobStore):
+    """Per-process job store bounded by job count (LRU) and age (TTL)"""
+
+    def __init__(self, max_jobs: int = 1000, ttl_seconds: int = 24 * 3600):
+        super().__init__()
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        # job_id -> (job fields, {index: frame})
+        self._jobs = OrderedDict()
+        # job_id -> (worker_id, lease expiry)
+        self._leases = {}
+        self.evictions = 0
+
+    async def create(self, job_id: str, job: dict):
+        now = time.time()
+        self._jobs[job_id] = ({**job, "created_at": now, "updated_at": now}, {})
+        while len(self._jobs) > self.max_jobs:
+            evicted, _ = self._jobs.popitem(last=False)
+            self._leases.pop(evicted, None)
+            self.evictions += 1
+
+    async def get(self, job_id: str, include_frames: bool = True) -> Optional[dict]:
+        entry = self._jobs.get(job_id)
+        if entry is None:
+            return None
+        self._jobs.move_to_end(job_id)
+        fields, frames = entry
+        job = dict(fields)
+        if include_frames:
+            job["frames"] = [frames[index] for index in sorted(frames)]
+        return job
+
+    async def update(self, job_id: str, **fields):
+        entry = self._jobs.get(job_id)
+        if entry is not None:
+            entry[0].update(fields, updated_at=time.time())
+            self._notify(job_id)
+
+    async def transition(self, job_id: str, from_statuses: tuple, **fields) -> bool:
+        entry = self._jobs.get(job_id)
+        if entry is None or entry[0].get("status") not in from_statuses:
+            return False
+        entry[0].update(fields, updated_at=time.time())
+        self._notify(job_id)
+        return True
+
+    async def add_frame(self, job_id: str, index: int, frame: dict):
+        entry = self._jobs.get(job_id)
+        if entry is not None:
+            entry[1][index] = frame
+            entry[0]["updated_at"] = time.time()
+            self._notify(job_id)
+
+    async def get_frames(self, job_id: str, start: int = 0, end: Optional[int] = None) -> list:
+        entry = self._jobs.get(job_id)
+        if entry is None:
+            return []
+        frames = entry[1]
+        return [frames[index] for index in sorted(frames) if index >= start and (end is None or index < end)]
+
+    async def delete(self, job_id: str) -> bool:
+        deleted = self._jobs.pop(job_id, None) is not None
+        self._leases.pop(job_id, None)
+        self._notify(job_id)
+        return deleted
+
+    async def cleanup(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [job_id for job_id, (fields, _) in self._jobs.items() if fields["updated_at"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._leases.pop(job_id, None)
+        return len(expired)
+
+    async def count(self) -> int:
+        return len(self._jobs)
+
+    async def claim(self, worker_id: str, lease_seconds: float) -> Optional[dict]:
+        now = time.time()
+        runnable = [
+            (fields["created_at"], job_id) for job_id, (fields, _) in self._jobs.items()
+            if fields.get("status") in RUNNABLE_STATUSES and "request" in fields
+            and self._leases.get(job_id, (None, 0.0))[1] < now
+        ]
+        if not runnable:
+            return None
+        _, job_id = min(runnable)
+        self._leases[job_id] = (worker_id, now + lease_seconds)
+        fields = self._jobs[job_id][0]
+        fields["attempts"] = fields.get("attempts", 0) + 1
+        return {**fields, "id": job_id}
+
+    async def renew(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        entry = self._jobs.get(job_id)
+        if entry is None or entry[0].get("status") not in RUNNABLE_STATUSES or self._leases.get(job_id, (None,))[0] != worker_id:
+            return False
+        self._leases[job_id] = (worker_id, time.time() + lease_seconds)
+        return True
+
+    async def release(self, job_id: str, worker_id: str):
+        if self._leases.get(job_id, (None,))[0] == worker_id:
+            del self._leases[job_id]
+
+
+class SQLiteJobStore(JobStore):
+    """Job store in a SQLite file, so every uvicorn worker on the host sees the same jobs"""
+
+    def __init__(self, path: str, ttl_seconds: int = 24 * 3600):
+        super().__init__()
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock:
+            # WAL lets readers in other workers proceed while a job is being updated
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS video_jobs ("
+                " id TEXT PRIMARY KEY,"
+                " fields TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS video_job_frames ("
+                " job_id TEXT NOT NULL,"
+                " idx INTEGER NOT NULL,"
+                " frame TEXT NOT NULL,"
+                " PRIMARY KEY (job_id, idx))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS video_jobs_updated_at ON video_jobs (updated_at)")
+            # Lease columns were added after the table; add them to databases created before
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(video_jobs)")}
+            if "lease_owner" not in columns:
+                self._conn.execute("ALTER TABLE video_jobs ADD COLUMN lease_owner TEXT")
+                self._conn.execute("ALTER TABLE video_jobs ADD COLUMN lease_until REAL")
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _create(self, job_id: str, job: dict):
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO video_jobs (id, fields, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            (job_id, json.dumps(job), now, now)
+        )
+
+    def _get(self, job_id: str, include_frames: bool) -> Optional[dict]:
+        rows = self._execute("SELECT fields, created_at, updated_at FROM video_jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        fields, created_at, updated_at = rows[0]
+        job = {**json.loads(fields), "created_at": created_at, "updated_at": updated_at}
+        if include_frames:
+            frames = self._execute("SELECT frame FROM video_job_frames WHERE job_id = ? ORDER BY idx", (job_id,))
+            job["frames"] = [json.loads(frame) for (frame,) in frames]
+        return job
+
+    def _update(self, job_id: str, fields: dict, from_statuses: Optional[tuple] = None) -> bool:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT fields FROM video_jobs WHERE id = ?", (job_id,)).fetchone()
+                updated = False
+                if row is not None:
+                    current = json.loads(row[0])
+                    if from_statuses is None or current.get("status") in from_statuses:
+                        self._conn.execute(
+                            "UPDATE video_jobs SET fields = ?, updated_at = ? WHERE id = ?",
+                            (json.dumps({**current, **fields}), time.time(), job_id)
+                        )
+                        updated = True
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return updated
+
+    def _add_frame(self, job_id: str, index: int, frame: dict):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO video_job_frames (job_id, idx, frame) VALUES (?, ?, ?)",
+                    (job_id, index, json.dumps(frame))
+                )
+                self._conn.execute("UPDATE video_jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _delete(self, job_id: str) -> bool:
+        with self._lock:
+            self._conn.execute("DELETE FROM video_job_frames WHERE job_id = ?", (job_id,))
+            return self._conn.execute("DELETE FROM video_jobs WHERE id = ?", (job_id,)).rowcount > 0
+
+    def _cleanup(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM video_job_frames WHERE job_id IN (SELECT id FROM video_jobs WHERE updated_at < ?)",
+                (cutoff,)
+            )
+            return self._conn.execute("DELETE FROM video_jobs WHERE updated_at < ?", (cutoff,)).rowcount
+
+    def _claim(self, worker_id: str, lease_seconds: float) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two workers cannot claim the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, fields, created_at, updated_at FROM video_jobs"
+                    " WHERE json_extract(fields, '$.status') IN (?, ?)"
+                    " AND json_extract(fields, '$.request') IS NOT NULL"
+                    " AND (lease_until IS NULL OR lease_until < ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (*RUNNABLE_STATUSES, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                job_id, fields, created_at, updated_at = row
+                job = json.loads(fields)
+                job["attempts"] = job.get("attempts", 0) + 1
+                self._conn.execute(
+                    "UPDATE video_jobs SET fields = ?, lease_owner = ?, lease_until = ? WHERE id = ?",
+                    (json.dumps(job), worker_id, now + lease_seconds, job_id)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {**job, "id": job_id, "created_at": created_at, "updated_at": updated_at}
+
+    def _renew(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE video_jobs SET lease_until = ? WHERE id = ? AND lease_owner = ?"
+                " AND json_extract(fields, '$.status') IN (?, ?)",
+                (time.time() + lease_seconds, job_id, worker_id, *RUNNABLE_STATUSES)
+            ).rowcount > 0
+
+    def _release(self, job_id: str, worker_id: str):
+        self._execute(
+            "UPDATE video_jobs SET lease_owner = NULL, lease_until = NULL WHERE id = ? AND lease_owner = ?",
+            (job_id, worker_id)
+        )
+
+    async def create(self, job_id: str, job: dict):
+        await asyncio.to_thread(self._create, job_id, job)
+
+    async def get(self, job_id: str, include_frames: bool = True) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, job_id, include_frames)
+
+    async def update(self, job_id: str, **fields):
+        await asyncio.to_thread(self._update, job_id, fields)
+        self._notify(job_id)
+
+    async def transition(self, job_id: str, from_statuses: tuple, **fields) -> bool:
+        updated = await asyncio.to_thread(self._update, job_id, fields, tuple(from_statuses))
+        if updated:
+            self._notify(job_id)
+        return updated
+
+    async def add_frame(self, job_id: str, index: int, frame: dict):
+        await asyncio.to_thread(self._add_frame, job_id, index, frame)
+        self._notify(job_id)
+
+    async def get_frames(self, job_id: str, start: int = 0, end: Optional[int] = None) -> list:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT frame FROM video_job_frames WHERE job_id = ? AND idx >= ? AND idx < ? ORDER BY idx",
+            (job_id, start, end if end is not None else 2 ** 31)
+        )
+        return [json.loads(frame) for (frame,) in rows]
+
+    async def delete(self, job_id: str) -> bool:
+        deleted = await asyncio.to_thread(self._delete, job_id)
+        self._notify(job_id)
+        return deleted
+
+    async def cleanup(self) -> int:
+        return await asyncio.to_thread(self._cleanup)
+
+    async def count(self) -> int:
+        rows = await asyncio.to_thread(self._execute, "SELECT COUNT(*) FROM video_jobs")
+        return rows[0][0]
+
+    async def claim(self, worker_id: str, lease_seconds: float) -> Optional[dict]:
+        return await asyncio.to_thread(self._claim, worker_id, lease_seconds)
+
+    async def renew(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        return await asyncio.to_thread(self._renew, job_id, worker_id, lease_seconds)
+
+    async def release(self, job_id: str, worker_id: str):
+        await asyncio.to_thread(self._release, job_id, worker_id)
+
+
+def create_job_store(backend: str, **options) -> JobStore:
+    """Build the job store selected by VIDEO_JOB_STORE ("memory" or "sqlite")"""
+    if backend == "memory":
+        return MemoryJobStore(max_jobs=options["max_jobs"], ttl_seconds=options["ttl_seconds"])
+    if backend == "sqlite":
+        return SQLiteJobStore(options["path"], ttl_seconds=options["ttl_seconds"])
+    raise ValueError(f"Unknown video job store backend: {backend}")
@@ -1,41 +1,239 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import boto3
+from fastapi.responses import JSONResponse, StreamingResponse, Response, FileResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Optional
+from contextlib import asynccontextmanager
 import json
+import logging
 import os
 import base64
 from dotenv import load_dotenv
 import asyncio
 import uuid
 import time
+import socket
+import math
+import secrets
+from cache import ImageCache, cache_key
+from scheduler import GenerationScheduler, PRIORITY_INTERACTIVE, PRIORITY_VIDEO, PRIORITY_BULK
+from singleflight import SingleFlight
+from batcher import MicroBatcher
+from model_backends import create_backend
+from model_router import ModelRouter, is_backend_failure
+from content_filter import ContentFilter
+from bedrock_client import AsyncBedrockClient
+from image_store import ImageStore, CONTENT_TYPES, negotiate_format
+from image_processing import ImageProcessor, VARIANT_WIDTHS
+from job_store import RUNNABLE_STATUSES, create_job_store
+from rate_limit import Limit, RateLimiter, create_rate_limit_backend, image_cost
+from bulk_output import BulkOutput, OUTPUT_MODES, JOB_ID_PATTERN, cleanup_outputs, parse_bulk_items
+from video_encoder import VideoEncoder, available_encoder
+from frame_interpolation import available_methods, interpolate_frames, keyframe_indices
+from process_pool import ProcessPool
+import metrics
+from logging_setup import configure_logging
 
 load_dotenv()
 
-app = FastAPI()
+configure_logging(os.getenv('LOG_LEVEL', 'INFO'), os.getenv('LOG_FORMAT', 'text'))
+logger = logging.getLogger(__name__)
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that records how long serializing the body takes"""
+
+    def render(self, content) -> bytes:
+        with metrics.stage("response_serialize"):
+            return super().render(content)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background work with the server and stop it on shutdown.
+
+    Nothing slow runs before the server accepts connections: Bedrock
+    credentials and connections, the content filter and the image worker
+    processes are warmed up in the background, and GET /ready reports when
+    that has finished.
+    """
+    await start_background_tasks()
+    try:
+        yield
+    finally:
+        await stop_background_tasks()
+
+app = FastAPI(default_response_class=TimedJSONResponse, lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with your frontend URL
+    allow_origins=[origin.strip() for origin in os.getenv('CORS_ALLOW_ORIGINS', '*').split(',') if origin.strip()],  # In production, set this to your frontend URL
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Initialize AWS Bedrock client
-bedrock = boto3.client(
-    service_name='bedrock-runtime',
-    region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'),
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
+# Request latency per route, exposed with the other metrics on GET /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Content-addressed cache of generated images, keyed on the canonical request body
+image_cache = ImageCache(
+    directory=os.getenv('IMAGE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.image_cache')),
+    max_memory_bytes=int(os.getenv('IMAGE_CACHE_MEMORY_BYTES', str(256 * 1024 * 1024))),
+    ttl_seconds=int(os.getenv('IMAGE_CACHE_TTL_SECONDS', str(7 * 24 * 3600))),
+    enabled=os.getenv('IMAGE_CACHE_ENABLED', 'true').lower() == 'true',
+    max_disk_bytes=int(os.getenv('IMAGE_CACHE_DISK_BYTES', str(2 * 1024 * 1024 * 1024)))
+)
+
+# Decoded images served by GET /images/{id} when a request asks for URLs instead of base64
+image_store = ImageStore(
+    directory=os.getenv('IMAGE_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.image_store'))
+)
+
+# Worker processes shared by all CPU-bound work: image variants, frame interpolation and WebP video encoding
+process_pool = ProcessPool(int(os.getenv('PROCESS_POOL_SIZE', '2')))
+
+# Thumbnails, smaller sizes and WebP/AVIF copies of stored images, rendered in the process pool
+image_processor = ImageProcessor(
+    image_store,
+    process_pool,
+    webp_quality=int(os.getenv('IMAGE_WEBP_QUALITY', '85')),
+    avif_quality=int(os.getenv('IMAGE_AVIF_QUALITY', '60'))
+)
+# Variants rendered as soon as an image is stored ("variant:format,..."), so gallery views load without waiting
+IMAGE_PRERENDER_VARIANTS = [
+    tuple(item.strip().split(':', 1)) for item in os.getenv('IMAGE_PRERENDER_VARIANTS', 'thumb:webp').split(',') if item.strip()
+]
+
+# Shared limit on concurrent Bedrock calls across all requests and video jobs
+scheduler = GenerationScheduler(
+    max_concurrency=int(os.getenv('GENERATION_MAX_CONCURRENCY', '8'))
+)
+
+# Initialize AWS Bedrock client, with one pooled connection per scheduler slot
+bedrock = AsyncBedrockClient(
+    region=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'),
+    endpoint_url=os.getenv('BEDROCK_ENDPOINT_URL'),
+    max_connections=scheduler.max_concurrency,
+    max_retries=int(os.getenv('BEDROCK_MAX_RETRIES', '4')),
+    max_rate=float(os.getenv('BEDROCK_MAX_REQUESTS_PER_SECOND', '20'))
 )
 
+# Connections opened to Bedrock while warming up, so the first requests skip the TLS handshake
+BEDROCK_WARM_CONNECTIONS = int(os.getenv('BEDROCK_WARM_CONNECTIONS', '2'))
+
+# Prompt filter, compiled once from the wordlist and rebuilt when the file changes
+content_filter = ContentFilter(
+    os.getenv('CONTENT_FILTER_WORDLIST', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'filtered_words.txt')),
+    block_severity=os.getenv('CONTENT_FILTER_BLOCK_SEVERITY', 'low'),
+    reload_interval=float(os.getenv('CONTENT_FILTER_RELOAD_SECONDS', '5'))
+)
+
+# Identical generations that are already in flight share a single Bedrock call
+inflight_generations = SingleFlight()
+
+# Models to generate with, in order of preference. Prices ("name=usd,...") override the built-in list prices.
+MODEL_COSTS = {
+    name.strip(): float(cost)
+    for name, _, cost in (item.partition('=') for item in os.getenv('MODEL_COSTS', '').split(',') if item.strip())
+}
+# SDXL on Bedrock only accepts samples=1; raise this for an endpoint that supports more
+BEDROCK_MAX_SAMPLES = int(os.getenv('BEDROCK_MAX_SAMPLES', '1'))
+model_router = ModelRouter(
+    [
+        create_backend(name.strip(), MODEL_COSTS.get(name.strip()), BEDROCK_MAX_SAMPLES if name.strip() == 'sdxl' else None)
+        for name in os.getenv('MODEL_BACKENDS', 'sdxl').split(',') if name.strip()
+    ],
+    cost_weight=float(os.getenv('MODEL_ROUTER_COST_WEIGHT', '10')),
+    explore_rate=float(os.getenv('MODEL_ROUTER_EXPLORE_RATE', '0.05')),
+    cooldown_seconds=float(os.getenv('MODEL_ROUTER_COOLDOWN_SECONDS', '30')),
+    preference_seconds=float(os.getenv('MODEL_ROUTER_PREFERENCE_SECONDS', '30'))
+)
+# Retries per model before failing over to the next one; the last model left uses BEDROCK_MAX_RETRIES
+MODEL_FAILOVER_RETRIES = int(os.getenv('MODEL_FAILOVER_RETRIES', '1'))
+# Cache, coalescing and batching keys name the preferred model. Images drawn by another model after a
+# failover are returned but never cached, so a cache hit is always what the preferred model renders.
+IMAGE_KEY_NAMESPACE = model_router.preferred.model_id
+
+# Images that only differ by seed are batched into one multi-sample call when a model supports it
+generation_batcher = MicroBatcher(
+    max_batch_size=int(os.getenv('GENERATION_BATCH_MAX_SIZE', '8')) if model_router.max_samples > 1 else 1,
+    linger_seconds=float(os.getenv('GENERATION_BATCH_LINGER_MS', '10')) / 1000
+)
+
+# API keys clients may identify themselves with ("key1,key2,..."). Any other X-API-Key is ignored, so
+# a made-up key cannot get a fresh rate limit bucket and callers without a known key share their address's.
+API_KEYS = {key.strip() for key in os.getenv('API_KEYS', '').split(',') if key.strip()}
+
+# Image i of a request is drawn with seed i * 100, so a prompt keeps producing the same images. A preferred
+# model that takes several samples per call needs consecutive seeds to batch them, so it uses seed i.
+SEED_STRIDE = 1 if model_router.preferred.max_samples > 1 else 100
+
+def image_seed(index: int) -> int:
+    return index * SEED_STRIDE
+
+def get_client_id(http_request: Request) -> str:
+    """Identify the caller for fair queuing and rate limits, preferring a known API key over the client address"""
+    api_key = http_request.headers.get("x-api-key")
+    if api_key and api_key in API_KEYS:
+        return f"key:{api_key}"
+    return f"ip:{http_request.client.host if http_request.client else 'unknown'}"
+
+# Per-client token buckets, checked before any work starts. Images are weighted by images x steps x pixels,
+# where one unit is a full-quality 1024x1024 image; video jobs are metered in frames. Quotas of 0 are off.
+RATE_LIMIT_IMAGE_QUOTA_PER_DAY = float(os.getenv('RATE_LIMIT_IMAGE_UNITS_PER_DAY', '0'))
+RATE_LIMIT_VIDEO_QUOTA_PER_DAY = float(os.getenv('RATE_LIMIT_VIDEO_FRAMES_PER_DAY', '0'))
+rate_limiter = RateLimiter(
+    create_rate_limit_backend(
+        os.getenv('RATE_LIMIT_STORE', 'memory'),
+        path=os.getenv('RATE_LIMIT_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.rate_limits.sqlite3')),
+        max_clients=int(os.getenv('RATE_LIMIT_MAX_CLIENTS', '100000'))
+    ),
+    [
+        Limit("image_units_per_minute", "image_units", float(os.getenv('RATE_LIMIT_IMAGE_UNITS_PER_MINUTE', '60')) / 60, float(os.getenv('RATE_LIMIT_IMAGE_BURST', '100'))),
+        Limit("video_frames_per_minute", "video_frames", float(os.getenv('RATE_LIMIT_VIDEO_FRAMES_PER_MINUTE', '60')) / 60, float(os.getenv('RATE_LIMIT_VIDEO_BURST', '90'))),
+    ] + ([
+        Limit("image_units_per_day", "image_units", RATE_LIMIT_IMAGE_QUOTA_PER_DAY / 86400, RATE_LIMIT_IMAGE_QUOTA_PER_DAY)
+    ] if RATE_LIMIT_IMAGE_QUOTA_PER_DAY > 0 else []) + ([
+        Limit("video_frames_per_day", "video_frames", RATE_LIMIT_VIDEO_QUOTA_PER_DAY / 86400, RATE_LIMIT_VIDEO_QUOTA_PER_DAY)
+    ] if RATE_LIMIT_VIDEO_QUOTA_PER_DAY > 0 else []),
+    enabled=os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true',
+    # Usage accounting of clients not seen for this long is dropped by the periodic cleanup
+    usage_ttl=float(os.getenv('RATE_LIMIT_USAGE_TTL_SECONDS', str(7 * 86400)))
+)
+# Key for the /admin endpoints, sent as X-Admin-Key; they are disabled while it is unset
+ADMIN_API_KEY = os.getenv('ADMIN_API_KEY')
+
+async def enforce_rate_limit(client_id: str, **costs):
+    """Charge a request to the client's buckets, or reject it with 429 and Retry-After"""
+    limit = rate_limiter.exceeds_burst(costs)
+    if limit is not None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"This request needs {costs[limit.resource]:g} {limit.resource.replace('_', ' ')}, more than the limit of {limit.burst:g} allows. Please request fewer or smaller images."
+        )
+    retry_after = await rate_limiter.acquire(client_id, costs)
+    if retry_after:
+        logger.info("Rate limited %s for %.1fs", client_id, retry_after, extra={"client_id": client_id})
+        for resource in costs:
+            metrics.RATE_LIMITED_TOTAL.labels(resource).inc()
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded. Please retry later.",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+def request_image_cost(platform: str, quality: str, num_images: int = 1) -> float:
+    width, height, steps = image_dimensions(platform, quality)
+    return image_cost(num_images, width, height, steps)
+
 class PromptRequest(BaseModel):
     prompt: str
     platform: str = "web"  # Default to web, options: mobile, desktop, web
     style_preset: str = "photographic"  # Default style preset
     num_images: int = 4  # Default to 4 images
+    use_cache: bool = True  # Set to false to force a fresh generation
+    response_format: str = "base64"  # "base64" to inline images, "url" to link to GET /images/{id}
+    quality: str = "full"  # "preview" for fast low-step thumbnails, upgraded later with POST /upgrade-image
 
     @property
     def validate_num_images(self):
@@ -45,163 +243,552 @@ class PromptRequest(BaseModel):
             raise ValueError("Number of images cannot exceed 100")
         return self.num_images
 
+class UpgradeRequest(BaseModel):
+    prompt: str
+    seed: int  # Seed of the preview to re-render, as returned with it
+    platform: str = "web"
+    style_preset: str = "photographic"
+    use_cache: bool = True
+    response_format: str = "base64"
+
 class VideoPromptRequest(BaseModel):
     prompt: str
     duration: int = 5  # Duration in seconds, default 5 seconds
     style_preset: str = "photographic"  # Default style preset
+    use_cache: bool = True  # Set to false to force a fresh generation
+    response_format: str = "base64"  # "base64" to inline frames, "url" to link to GET /images/{id}
+    interpolation: Optional[str] = None  # "none", "crossfade" or "flow"; defaults to VIDEO_INTERPOLATION
+    keyframes: Optional[int] = None  # Frames generated by the model when interpolating; defaults to VIDEO_KEYFRAMES
 
-# Store for video generation jobs
-video_jobs = {}
+class BulkRequest(BaseModel):
+    items: List[PromptRequest]  # response_format is ignored, images are written to the job's output
+    output: str = "files"  # "files" for one PNG per image, "zip" for a single archive
+    use_cache: bool = True
 
-def generate_single_image(prompt: str, seed: int, platform: str = "web", style_preset: str = "photographic") -> dict:
+# Store and work queue for video generation jobs. Frames are kept in the image store and jobs only hold
+# references, so the sqlite backend can be shared by every worker on the host and survives restarts.
+video_jobs = create_job_store(
+    os.getenv('VIDEO_JOB_STORE', 'memory'),
+    path=os.getenv('VIDEO_JOB_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.video_jobs.sqlite3')),
+    max_jobs=int(os.getenv('VIDEO_JOB_MAX_JOBS', '1000')),
+    ttl_seconds=int(os.getenv('VIDEO_JOB_TTL_SECONDS', str(24 * 3600)))
+)
+# Frames are assembled into one video per job when an encoder (ffmpeg or Pillow) is available
+VIDEO_FPS = int(os.getenv('VIDEO_FPS', '10'))
+VIDEO_FORMAT = os.getenv('VIDEO_FORMAT', 'mp4')
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+# How often /video-events re-reads a job when no local update arrives (e.g. it runs in another worker)
+VIDEO_EVENTS_POLL_SECONDS = float(os.getenv('VIDEO_EVENTS_POLL_SECONDS', '2'))
+VIDEO_FORMATS = ("mp4", "webm", "webp")
+# With interpolation only keyframes are generated by the model and the frames between them are rendered
+# locally, cutting the upstream calls for a 30-frame video from 30 to VIDEO_KEYFRAMES
+VIDEO_INTERPOLATION = os.getenv('VIDEO_INTERPOLATION', 'none')
+VIDEO_KEYFRAMES = int(os.getenv('VIDEO_KEYFRAMES', '6'))
+# How closely each keyframe follows the one before it (0-1); lower values allow more change between them
+VIDEO_KEYFRAME_STRENGTH = float(os.getenv('VIDEO_KEYFRAME_STRENGTH', '0.6'))
+
+# Video jobs are run by queue workers in every process. A worker holds a lease on its job and renews it
+# while running; if the process dies the lease runs out and another worker resumes the job.
+VIDEO_WORKERS = int(os.getenv('VIDEO_WORKERS', '2'))
+VIDEO_JOB_LEASE_SECONDS = float(os.getenv('VIDEO_JOB_LEASE_SECONDS', '60'))
+VIDEO_JOB_MAX_ATTEMPTS = int(os.getenv('VIDEO_JOB_MAX_ATTEMPTS', '3'))
+VIDEO_QUEUE_POLL_SECONDS = float(os.getenv('VIDEO_QUEUE_POLL_SECONDS', '2'))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+video_queue_ready = asyncio.Event()
+video_workers = []
+
+# Bulk jobs run at the lowest priority in the process that accepted them and write their images to disk.
+# Their state uses the same store backend as video jobs, so any worker can report progress.
+BULK_JOB_TTL_SECONDS = int(os.getenv('BULK_JOB_TTL_SECONDS', str(24 * 3600)))
+bulk_jobs = create_job_store(
+    os.getenv('VIDEO_JOB_STORE', 'memory'),
+    path=os.getenv('BULK_JOB_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.bulk_jobs.sqlite3')),
+    max_jobs=int(os.getenv('VIDEO_JOB_MAX_JOBS', '1000')),
+    ttl_seconds=BULK_JOB_TTL_SECONDS
+)
+BULK_OUTPUT_DIR = os.getenv('BULK_OUTPUT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.bulk_output'))
+BULK_MAX_IMAGES = int(os.getenv('BULK_MAX_IMAGES', '10000'))
+# Images per bulk job waiting on the scheduler at once; enough to keep it busy and fill multi-sample batches
+BULK_MAX_IN_FLIGHT = int(os.getenv('BULK_MAX_IN_FLIGHT', '16'))
+bulk_tasks = {}
+
+IMAGE_STORE_TTL_SECONDS = int(os.getenv('IMAGE_STORE_TTL_SECONDS', str(7 * 24 * 3600)))
+CLEANUP_INTERVAL_SECONDS = int(os.getenv('CLEANUP_INTERVAL_SECONDS', '600'))
+
+async def cleanup_expired_data():
+    """Periodically drop expired jobs, bulk outputs, cached images and images not used within the retention window"""
+    while True:
+        await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
+        try:
+            removed_jobs = await video_jobs.cleanup()
+            removed_images = await asyncio.to_thread(image_store.cleanup, IMAGE_STORE_TTL_SECONDS)
+            removed_cached = await asyncio.to_thread(image_cache.cleanup)
+            removed_bulk = await bulk_jobs.cleanup()
+            await rate_limiter.cleanup()
+            await asyncio.to_thread(cleanup_outputs, BULK_OUTPUT_DIR, BULK_JOB_TTL_SECONDS)
+            if removed_jobs or removed_images or removed_bulk or removed_cached:
+                logger.info(
+                    "Cleanup removed %d video jobs, %d bulk jobs, %d stored images and %d cached images",
+                    removed_jobs, removed_bulk, removed_images, removed_cached
+                )
+        except Exception:
+            logger.exception("Error during cleanup")
+
+cleanup_task = None
+warm_up_task = None
+# Filled in by warm_up(); GET /ready answers 503 until it has finished
+readiness = {"ready": False, "warm_up_seconds": None, "checks": {}}
+
+async def warm_up():
+    """Do the slow one-off setup after the server has started accepting connections"""
+    started = time.perf_counter()
+    checks = {}
+    results = await asyncio.gather(
+        bedrock.warm_up(BEDROCK_WARM_CONNECTIONS),
+        asyncio.to_thread(content_filter.load),
+        process_pool.warm_up(),
+        return_exceptions=True
+    )
+    for name, result in zip(("bedrock", "content_filter", "process_pool"), results):
+        if isinstance(result, Exception):
+            logger.error("Warm-up of %s failed: %s", name, result)
+            checks[name] = {"ok": False, "error": str(result)}
+        else:
+            checks[name] = {"ok": True, **(result if isinstance(result, dict) else {})}
+    readiness["checks"] = checks
+    readiness["warm_up_seconds"] = time.perf_counter() - started
+    # Prompts cannot be validated without the filter; everything else is retried on first use
+    readiness["ready"] = checks["content_filter"]["ok"]
+    logger.info("Warm-up finished in %.3fs", readiness["warm_up_seconds"], extra={"checks": checks})
+
+async def start_background_tasks():
+    global cleanup_task, warm_up_task
+    warm_up_task = asyncio.create_task(warm_up())
+    cleanup_task = asyncio.create_task(cleanup_expired_data())
+    for _ in range(VIDEO_WORKERS):
+        video_workers.append(asyncio.create_task(video_job_worker()))
+
+async def stop_background_tasks():
+    # Running video jobs release their lease on the way out and are resumed by the next worker to start.
+    # Bulk jobs are not resumed; they are marked failed with what they finished so far left on disk.
+    tasks = video_workers + list(bulk_tasks.values()) + [task for task in (warm_up_task, cleanup_task) if task]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    video_workers.clear()
+    await bedrock.aclose()
+    process_pool.shutdown()
+
+async def build_image_result(data: bytes, response_format: str, **metadata) -> dict:
+    """Package decoded image bytes either inline as base64 or as a link to the image store"""
+    with metrics.stage("result_build", response_format=response_format):
+        if response_format == "url":
+            image_id = await asyncio.to_thread(image_store.put, data)
+            image_processor.prerender(image_id, IMAGE_PRERENDER_VARIANTS)
+            return {
+                "id": image_id,
+                "url": f"/images/{image_id}",
+                "content_type": "image/png",
+                "bytes": len(data),
+                # Smaller sizes for grids and responsive layouts, in the best format the client accepts
+                "variants": {variant: f"/images/{image_id}?variant={variant}" for variant in VARIANT_WIDTHS if variant != "full"},
+                **metadata
+            }
+        if response_format == "raw":
+            # Internal only: the PNG bytes themselves, for callers that write images out (bulk jobs)
+            return {"data": data, **metadata}
+        return {"base64": base64.b64encode(data).decode("ascii"), **metadata}
+
+def seed_runs(seeds: list, max_samples: int) -> list:
+    """Split seeds into runs of consecutive values, each short enough for one multi-sample call"""
+    runs = []
+    for seed in sorted(set(seeds)):
+        if runs and seed == runs[-1][-1] + 1 and len(runs[-1]) < max_samples:
+            runs[-1].append(seed)
+        else:
+            runs.append([seed])
+    return runs
+
+async def invoke_and_cache(backend, params: dict, seeds: list, max_retries: int = None) -> dict:
+    """Run one generation for consecutive seeds on a backend and return {seed: PNG bytes} for what came back"""
+    started = time.perf_counter()
+    try:
+        artifacts = await backend.generate(bedrock, params, seeds, max_retries)
+    except Exception as e:
+        if is_backend_failure(e):
+            model_router.record_failure(backend, throttled=getattr(e, "throttled", False))
+        metrics.MODEL_CALLS_TOTAL.labels(backend.name, "error").inc()
+        raise
+    model_router.record_success(backend, time.perf_counter() - started)
+    metrics.MODEL_CALLS_TOTAL.labels(backend.name, "success").inc()
+    
+    results = {}
+    for seed, artifact in artifacts:
+        if seed not in seeds:
+            continue
+        # Decode once; the cache and the image store both keep raw PNG bytes
+        with metrics.stage("artifact_decode"):
+            data = base64.b64decode(artifact)
+        # Always refresh the cache, even when this request bypassed the lookup
+        if backend is model_router.preferred:
+            with metrics.stage("cache_store"):
+                await asyncio.to_thread(image_cache.put, cache_key(IMAGE_KEY_NAMESPACE, {**params, "seed": seed}), data)
+        results[seed] = data
+    if not results:
+        logger.error("Error in response from %s for seeds %s", backend.name, seeds)
+    return results
+
+async def generate_run(params: dict, seeds: list, client_id: str, priority: int, exclude: frozenset = frozenset()) -> dict:
+    """Generate consecutive seeds on the best available model, failing over when a model is throttled or down"""
+    backend = model_router.choose(exclude)
+    if len(seeds) > backend.max_samples:
+        # Chosen model takes fewer samples per call than the batch was planned for
+        parts = await asyncio.gather(*[
+            generate_run(params, part, client_id, priority, exclude) for part in seed_runs(seeds, backend.max_samples)
+        ])
+        return {seed: data for part in parts for seed, data in part.items()}
+
+    tried = exclude | {backend.name}
+    can_fail_over = model_router.has_alternative(tried)
+    try:
+        return await scheduler.submit(
+            client_id,
+            priority,
+            lambda: invoke_and_cache(backend, params, seeds, MODEL_FAILOVER_RETRIES if can_fail_over else None)
+        )
+    except Exception as e:
+        if not (can_fail_over and is_backend_failure(e)):
+            raise
+        model_router.failovers += 1
+        logger.warning("Model %s failed (%s), failing over", backend.name, e, extra={"model": backend.name})
+        return await generate_run(params, seeds, client_id, priority, tried)
+
+async def generate_batch(params: dict, seeds: list, client_id: str, priority: int) -> dict:
+    """Generate a batch of seeds with as few upstream calls as the models allow"""
+    runs = seed_runs(seeds, model_router.max_samples)
+    outcomes = await asyncio.gather(
+        *[generate_run(params, run, client_id, priority) for run in runs],
+        return_exceptions=True
+    )
+    results = {}
+    for run, outcome in zip(runs, outcomes):
+        if isinstance(outcome, Exception):
+            # Only the seeds in the failed call see the error
+            results.update({seed: outcome for seed in run})
+        else:
+            results.update(outcome)
+    return results
+
+# Previews use few steps and the smallest size the models accept, keeping each platform's aspect ratio
+PREVIEW_STEPS = int(os.getenv('PREVIEW_STEPS', '10'))
+PREVIEW_DIMENSIONS = {"mobile": (576, 768), "desktop": (768, 576), "web": (512, 512)}
+FULL_STEPS = 50
+QUALITIES = ("full", "preview")
+
+def image_dimensions(platform: str, quality: str = "full") -> tuple:
+    """Return the (width, height, steps) an image is rendered with"""
+    # Set dimensions based on platform
+    # AWS Bedrock SDXL supports dimensions between 512x512 and 1024x1024; other models pick their closest size
+    if platform == "mobile":
+        # For mobile, use a portrait orientation
+        width, height = 768, 1024  # Portrait orientation for mobile
+    elif platform == "desktop":
+        # For desktop, use a landscape orientation
+        width, height = 1024, 768  # Landscape orientation for desktop
+    else:  # web or default
+        width, height = 1024, 1024  # Square for web
+    steps = FULL_STEPS
+    if quality == "preview":
+        width, height = PREVIEW_DIMENSIONS.get(platform, PREVIEW_DIMENSIONS["web"])
+        steps = PREVIEW_STEPS
+    return width, height, steps
+
+async def generate_single_image(prompt: str, seed: int, platform: str = "web", style_preset: str = "photographic", use_cache: bool = True, response_format: str = "base64", client_id: str = "internal", priority: int = PRIORITY_INTERACTIVE, quality: str = "full", init_image: bytes = None, image_strength: float = None) -> dict:
+    """Generate one image, serving it from the cache when possible.
+
+    With ``init_image`` the image is drawn from that PNG instead of from noise,
+    staying as close to it as ``image_strength`` (0-1) asks.
+
+    Only the Bedrock call itself goes through the shared scheduler, so cache hits
+    and callers waiting on an identical in-flight generation do not hold a slot.
+    Misses that only differ by seed are handed to the batcher, which may fold
+    them into one multi-sample call.
+    """
+    outcome = "error"
+    started = time.perf_counter()
     try:
         # Validate prompt length
         if len(prompt) > 1000:
             raise ValueError("Prompt is too long. Maximum length is 1000 characters.")
+        if response_format not in ("base64", "url", "raw"):
+            raise ValueError("response_format must be either 'base64' or 'url'.")
+        if quality not in QUALITIES:
+            raise ValueError("quality must be either 'full' or 'preview'.")
         
-        # Set dimensions based on platform
-        # AWS Bedrock SDXL supports dimensions between 512x512 and 1024x1024
-        if platform == "mobile":
-            # For mobile, use a portrait orientation
-            width, height = 768, 1024  # Portrait orientation for mobile
-        elif platform == "desktop":
-            # For desktop, use a landscape orientation
-            width, height = 1024, 768  # Landscape orientation for desktop
-        else:  # web or default
-            width, height = 1024, 1024  # Square for web
+        width, height, steps = image_dimensions(platform, quality)
         
-        request_body = {
-            "text_prompts": [
-                {
-                    "text": prompt,
-                    "weight": 1.0
-                }
-            ],
+        # Model-independent description of the image; each backend turns it into its own request body
+        params = {
+            "prompt": prompt,
             "cfg_scale": 8.0,
-            "steps": 50,
+            "steps": steps,
             "width": width,
             "height": height,
-            "seed": seed,
             "style_preset": style_preset
         }
+        if init_image is not None:
+            params["init_image"] = base64.b64encode(init_image).decode("ascii")
+            params["image_strength"] = image_strength
         
-        print(f"Generating image with seed {seed} for platform {platform} ({width}x{height}) with style {style_preset}")
+        key = cache_key(IMAGE_KEY_NAMESPACE, {**params, "seed": seed})
+        if use_cache:
+            with metrics.stage("cache_lookup"):
+                cached = await asyncio.to_thread(image_cache.get, key)
+            if cached is not None:
+                outcome = "cache_hit"
+                return await build_image_result(
+                    cached,
+                    response_format,
+                    platform=platform,
+                    width=width,
+                    height=height,
+                    style_preset=style_preset,
+                    seed=seed,
+                    quality=quality,
+                    cached=True
+                )
+
+        logger.info(
+            "Generating image with seed %d for platform %s (%dx%d) with style %s", seed, platform, width, height, style_preset,
+            extra={"seed": seed, "platform": platform, "style_preset": style_preset, "client_id": client_id}
+        )
         try:
-            response = bedrock.invoke_model(
-                modelId='stability.stable-diffusion-xl-v1',
-                contentType="application/json",
-                accept="application/json",
-                body=json.dumps(request_body)
+            data = await inflight_generations.do(
+                key,
+                lambda: generation_batcher.submit(
+                    (cache_key(IMAGE_KEY_NAMESPACE, params), client_id, priority),
+                    seed,
+                    lambda seeds: generate_batch(params, seeds, client_id, priority)
+                ),
+                # Joining a call queued at a lower priority would make this one wait behind it
+                priority
             )
-            
-            response_body = json.loads(response.get('body').read())
-            
-            if 'artifacts' in response_body and len(response_body['artifacts']) > 0:
-                return {
-                    "base64": response_body['artifacts'][0]['base64'],
-                    "platform": platform,
-                    "width": width,
-                    "height": height,
-                    "style_preset": style_preset
-                }
-            else:
-                print(f"Error in response: {response_body}")
+            if data is None:
+                outcome = "empty"
                 return None
+            outcome = "success"
+            return await build_image_result(
+                data,
+                response_format,
+                platform=platform,
+                width=width,
+                height=height,
+                style_preset=style_preset,
+                seed=seed,
+                quality=quality,
+                cached=False
+            )
         except Exception as e:
             if "ValidationException" in str(e) and "invalid_prompts" in str(e):
-                # Extract filtered words from the prompt by comparing with known filtered words
-                # Note: This is a simplified approach. In production, you'd want to use AWS Bedrock's
-                # actual filtered words list or a more sophisticated detection method
-                words = prompt.lower().split()
-                # Common categories of filtered words to check (this is a minimal example)
-                potential_filtered = [word for word in words if any(category in word for category in [
-                    'nude', 'naked', 'sex', 'porn', 'gore', 'blood', 'violence', 'explicit',
-                    'drug', 'terrorist', 'weapon', 'kill', 'death', 'abuse'
-                ])]
+                # Report whichever of our listed terms the prompt contains. Note: Bedrock does not say which
+                # words it rejected, so anything below the blocking severity is reported here as well.
+                _, potential_filtered = check_filtered_words(prompt, include_all=True)
                 
                 raise ValueError(f"Filtered words detected in prompt: {', '.join(potential_filtered) if potential_filtered else 'Content not allowed by safety system'}")
             raise
     except Exception as e:
-        print(f"Error in generate_single_image: {str(e)}")
+        logger.error("Error in generate_single_image: %s", e, extra={"seed": seed, "platform": platform, "client_id": client_id})
         raise
+    finally:
+        metrics.observe_stage("total", time.perf_counter() - started)
+        metrics.count_image(platform, style_preset, outcome)
+
+def video_frame_count(duration: int) -> int:
+    # Calculate number of frames based on duration
+    num_frames = duration * VIDEO_FPS
+    
+    # Limit to a reasonable number of frames
+    return min(num_frames, 30)
+
+def video_frame_plan(request: VideoPromptRequest) -> tuple:
+    """Return (number of frames, interpolation method, indices of the frames the model generates)"""
+    num_frames = video_frame_count(request.duration)
+    method = request.interpolation or VIDEO_INTERPOLATION
+    if method == "none" or method not in available_methods():
+        return num_frames, "none", list(range(num_frames))
+    return num_frames, method, keyframe_indices(num_frames, request.keyframes or VIDEO_KEYFRAMES)
+
+async def generate_keyframes(prompt: str, style_preset: str, use_cache: bool, client_id: str, indices: list, frames: dict, on_frame):
+    """Generate keyframes in order, each drawn from the one before it with the same seed.
+
+    The first keyframe comes from the prompt alone, like frame 0 of any video.
+    Every later one is an image-to-image pass over the previous keyframe, so
+    consecutive keyframes are small variations of one picture rather than
+    unrelated samples. Keyframes already in ``frames`` (index -> stored frame)
+    are reused, and a failed one is skipped so the next builds on the last
+    keyframe that worked.
+    """
+    previous = None
+    for index in indices:
+        if index in frames:
+            previous = frames[index]
+            continue
+        init_image = await asyncio.to_thread(image_store.read, previous["id"]) if previous else None
+        try:
+            frame = await generate_single_image(
+                prompt, image_seed(0), "desktop", style_preset, use_cache, "url", client_id, PRIORITY_VIDEO,
+                init_image=init_image, image_strength=VIDEO_KEYFRAME_STRENGTH
+            )
+        except Exception as e:
+            logger.error("Error generating keyframe %d: %s", index, e)
+            frame = None
+        await on_frame(index, frame)
+        if frame:
+            previous = frame
+
+async def interpolate_video_frames(frames: dict, num_frames: int, method: str, on_frame, indices: list = None):
+    """Fill the frames missing from ``frames`` (index -> stored frame) from the nearest frames on either side.
 
-async def generate_video_frames(prompt: str, duration: int, style_preset: str) -> list:
-    """Generate a sequence of images to create a video effect"""
+    Each gap between two frames is interpolated in one call to the process pool, all gaps at once.
+    ``on_frame(index, frame)`` is awaited for every filled frame, with ``None`` if interpolation failed.
+    ``indices`` limits filling to those frames, e.g. the gap behind a keyframe that just finished.
+    """
+    available = sorted(frames)
+    gaps = {}
+    for index in range(num_frames) if indices is None else indices:
+        if index not in frames:
+            before = max((i for i in available if i < index), default=None)
+            after = min((i for i in available if i > index), default=None)
+            gaps.setdefault((before, after), []).append(index)
+
+    async def fill(before, after, indices: list):
+        if before is None or after is None:
+            # Past the first or last frame there is nothing to blend towards, so the edge frame is held
+            edge = after if before is None else before
+            for index in indices:
+                await on_frame(index, {**frames[edge], "interpolated": True, "keyframes": [edge]})
+            return
+        start, end = frames[before], frames[after]
+        try:
+            images = await process_pool.submit(
+                interpolate_frames,
+                image_store.path(start["id"]),
+                image_store.path(end["id"]),
+                [(index - before) / (after - before) for index in indices],
+                method
+            )
+        except Exception as e:
+            logger.error("Error interpolating frames %d-%d: %s", before, after, e)
+            images = [None] * len(indices)
+        for index, data in zip(indices, images):
+            frame = None
+            if data:
+                frame = await build_image_result(
+                    data,
+                    "url",
+                    platform=start.get("platform"),
+                    width=start.get("width"),
+                    height=start.get("height"),
+                    style_preset=start.get("style_preset"),
+                    interpolated=True,
+                    keyframes=[before, after]
+                )
+            await on_frame(index, frame)
+
+    await asyncio.gather(*[fill(before, after, indices) for (before, after), indices in gaps.items()])
+
+async def generate_video_frames(prompt: str, duration: int, style_preset: str, use_cache: bool = True, client_id: str = "internal", response_format: str = "base64", on_frame=None, indices: list = None) -> list:
+    """Generate a sequence of images to create a video effect.
+
+    If given, ``on_frame(index, frame)`` is awaited as each frame finishes, with ``None`` for failed frames.
+    ``indices`` limits generation to those frames, e.g. the ones still missing when a job is resumed.
+    """
     try:
-        # Calculate number of frames based on duration (assuming 10 fps)
-        fps = 10
-        num_frames = duration * fps
-        
-        # Limit to a reasonable number of frames
-        num_frames = min(num_frames, 30)
+        if indices is None:
+            indices = range(video_frame_count(duration))
         
-        print(f"Generating {num_frames} frames for video with prompt: {prompt}")
+        logger.info("Generating %d frames for video with prompt: %s", len(indices), prompt)
         
-        # Generate frames in parallel
-        tasks = []
-        for i in range(num_frames):
-            # Use different seeds for each frame to create variation
-            seed = i * 100
-            tasks.append(asyncio.to_thread(generate_single_image, prompt, seed, "desktop", style_preset))
+        async def generate_frame(index: int, seed: int):
+            try:
+                frame = await generate_single_image(prompt, seed, "desktop", style_preset, use_cache, response_format, client_id, PRIORITY_VIDEO)
+            except Exception as e:
+                logger.error("Error generating frame %d: %s", index, e)
+                frame = None
+            if on_frame:
+                await on_frame(index, frame)
+            return frame
 
-        
-        # Wait for all frames to be generated
-        frames = []
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        for result in results:
-            if isinstance(result, Exception):
-                print(f"Error generating frame: {str(result)}")
-                continue
-            if result:
-                frames.append(result)
-        
-        if not frames:
-            raise Exception("No frames were generated for the video")
-        
-        return frames
+        # Generate frames in parallel, using different seeds for each frame to create variation
+        results = await asyncio.gather(*[generate_frame(i, image_seed(i)) for i in indices])
+        return [frame for frame in results if frame]
     except Exception as e:
-        print(f"Error generating video frames: {str(e)}")
+        logger.error("Error generating video frames: %s", e)
         raise
 
-def check_filtered_words(prompt: str) -> tuple[bool, list[str]]:
+def check_filtered_words(prompt: str, include_all: bool = False) -> tuple[bool, list[str]]:
     """Check if the prompt contains any filtered words and return them"""
-    words = prompt.lower().split()
-    filtered_categories = [
-        'nude', 'naked', 'sex', 'porn', 'gore', 'blood', 'violence', 'explicit',
-        'drug', 'terrorist', 'weapon', 'kill', 'death', 'abuse', 'child', 'children'
-    ]
-    potential_filtered = [word for word in words if any(category in word for category in filtered_categories)]
-    return bool(potential_filtered), potential_filtered
+    matches = content_filter.scan(prompt)
+    if not include_all:
+        matches = content_filter.blocked(prompt, matches)
+    # Report each offending word once, in prompt order
+    words = list(dict.fromkeys(match.word.lower() for match in sorted(matches, key=lambda match: match.start)))
+    return bool(words), words
 
-@app.post("/generate-images")
-async def generate_images(request: PromptRequest):
+def validate_response_format(response_format: str):
+    if response_format not in ("base64", "url"):
+        raise HTTPException(
+            status_code=400,
+            detail="response_format must be either 'base64' or 'url'."
+        )
+
+def validate_prompt_request(request: PromptRequest) -> int:
+    """Run the pre-generation checks shared by the image endpoints and return the image count"""
+    # Validate number of images first
     try:
-        # Validate number of images first
-        try:
-            num_images = request.validate_num_images
-        except ValueError as ve:
-            raise HTTPException(
-                status_code=400,
-                detail=str(ve)
-            )
+        num_images = request.validate_num_images
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=400,
+            detail=str(ve)
+        )
 
-        # Check for filtered words before starting image generation
-        has_filtered, filtered_words = check_filtered_words(request.prompt)
-        if has_filtered:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Your prompt contains filtered words that are not allowed: {', '.join(filtered_words)}. Please modify your prompt to avoid inappropriate or sensitive content."
-            )
+    validate_response_format(request.response_format)
+    if request.quality not in QUALITIES:
+        raise HTTPException(
+            status_code=400,
+            detail="quality must be either 'full' or 'preview'."
+        )
+
+    validate_prompt_words(request.prompt)
+    return num_images
+
+def validate_prompt_words(prompt: str):
+    # Check for filtered words before starting image generation
+    has_filtered, filtered_words = check_filtered_words(prompt)
+    if has_filtered:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Your prompt contains filtered words that are not allowed: {', '.join(filtered_words)}. Please modify your prompt to avoid inappropriate or sensitive content."
+        )
+
+@app.post("/generate-images")
+async def generate_images(request: PromptRequest, http_request: Request):
+    try:
+        num_images = validate_prompt_request(request)
 
         # Use the prompt as is
         prompt = request.prompt
         
-        print(f"Generating {num_images} images for prompt: {prompt} for platform: {request.platform} with style: {request.style_preset}")
-        
+        client_id = get_client_id(http_request)
+        await enforce_rate_limit(client_id, image_units=request_image_cost(request.platform, request.quality, num_images))
+        logger.info(
+            "Generating %d images for prompt: %s for platform: %s with style: %s", num_images, prompt, request.platform, request.style_preset,
+            extra={"num_images": num_images, "platform": request.platform, "style_preset": request.style_preset, "client_id": client_id}
+        )
         tasks = []
         for i in range(num_images):
-            tasks.append(asyncio.to_thread(generate_single_image, prompt, i*100, request.platform, request.style_preset))
+            tasks.append(generate_single_image(prompt, image_seed(i), request.platform, request.style_preset, request.use_cache, request.response_format, client_id, quality=request.quality))
         
         # Wait for all images to be generated
         images = []
@@ -210,7 +797,7 @@ async def generate_images(request: PromptRequest):
         for result in results:
             if isinstance(result, Exception):
                 error_str = str(result)
-                print(f"Error generating image: {error_str}")
+                logger.error("Error generating image: %s", error_str)
                 # Still check for other types of errors
                 if "ValidationException" in error_str and "invalid_prompts" in error_str:
                     # If somehow a filtered word was missed in our pre-check
@@ -239,7 +826,7 @@ async def generate_images(request: PromptRequest):
         )
     except Exception as e:
         error_message = str(e)
-        print(f"Error generating images: {error_message}")
+        logger.error("Error generating images: %s", error_message)
         
         if "AccessDeniedException" in error_message:
             raise HTTPException(
@@ -269,84 +856,866 @@ async def generate_images(request: PromptRequest):
                 detail=f"Error generating images: {error_message}"
             )
 
+def describe_image_error(error: Exception) -> str:
+    """Turn a failed generation into a message that is safe to send to the client"""
+    error_message = str(error)
+    if "AccessDeniedException" in error_message:
+        return "AWS Bedrock access denied. Please check your credentials and permissions."
+    if "ValidationException" in error_message and "invalid_prompts" in error_message:
+        return "Additional content filtering applied by the AI system. Please modify your prompt."
+    if isinstance(error, ValueError):
+        return error_message
+    return f"Error generating image: {error_message}"
+
+def format_stream_event(event: str, data: dict, sse: bool) -> str:
+    payload = json.dumps({"event": event, **data})
+    if sse:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+@app.post("/generate-images/stream")
+async def generate_images_stream(request: PromptRequest, http_request: Request):
+    """Stream each image as soon as it is ready, as Server-Sent Events or newline-delimited JSON.
+
+    SSE is used when the client sends ``Accept: text/event-stream``, NDJSON otherwise.
+    """
+    num_images = validate_prompt_request(request)
+    sse = "text/event-stream" in http_request.headers.get("accept", "")
+    client_id = get_client_id(http_request)
+    await enforce_rate_limit(client_id, image_units=request_image_cost(request.platform, request.quality, num_images))
+    prompt = request.prompt
+
+    logger.info(
+        "Streaming %d images for prompt: %s for platform: %s with style: %s", num_images, prompt, request.platform, request.style_preset,
+        extra={"num_images": num_images, "platform": request.platform, "style_preset": request.style_preset, "client_id": client_id}
+    )
+
+    async def event_stream():
+        # Workers hand results over through the queue and keep no reference to them,
+        # so each image can be released as soon as it has been written out
+        results = asyncio.Queue()
+
+        async def worker(index: int, seed: int):
+            try:
+                image = await generate_single_image(prompt, seed, request.platform, request.style_preset, request.use_cache, request.response_format, client_id, quality=request.quality)
+                await results.put((index, seed, image, None))
+            except Exception as e:
+                await results.put((index, seed, None, e))
+
+        tasks = [asyncio.create_task(worker(i, image_seed(i))) for i in range(num_images)]
+        generated = 0
+        failed = 0
+        try:
+            for _ in range(num_images):
+                index, seed, image, error = await results.get()
+                if image:
+                    generated += 1
+                    yield format_stream_event("image", {"index": index, "seed": seed, "image": image}, sse)
+                else:
+                    failed += 1
+                    detail = describe_image_error(error) if error else "No image was returned for this seed."
+                    logger.error("Error generating image %d: %s", index, error)
+                    yield format_stream_event("error", {"index": index, "seed": seed, "detail": detail}, sse)
+                del image
+            yield format_stream_event("done", {"generated": generated, "failed": failed}, sse)
+        finally:
+            # Stop queued work if the client disconnects part-way through
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/upgrade-image")
+async def upgrade_image(request: UpgradeRequest, http_request: Request):
+    """Re-render a preview at full quality with the same seed, so the composition is kept"""
+    validate_response_format(request.response_format)
+    if request.seed < 0 or request.seed > 4294967295:
+        raise HTTPException(
+            status_code=400,
+            detail="seed must be between 0 and 4294967295"
+        )
+    validate_prompt_words(request.prompt)
+    client_id = get_client_id(http_request)
+    await enforce_rate_limit(client_id, image_units=request_image_cost(request.platform, "full"))
+
+    try:
+        # Goes through the same cache and in-flight coalescing as a full-quality request for this seed
+        image = await generate_single_image(request.prompt, request.seed, request.platform, request.style_preset, request.use_cache, request.response_format, client_id)
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=400,
+            detail=str(ve)
+        )
+    except Exception as e:
+        error_message = str(e)
+        raise HTTPException(
+            status_code=403 if "AccessDeniedException" in error_message else 400 if "ValidationException" in error_message else 500,
+            detail=describe_image_error(e)
+        )
+    if not image:
+        raise HTTPException(
+            status_code=500,
+            detail="No image was generated. Please try again."
+        )
+    return {"image": image}
+
 @app.post("/generate-video")
-async def generate_video(request: VideoPromptRequest):
+async def generate_video(request: VideoPromptRequest, http_request: Request):
+    validate_response_format(request.response_format)
+    if request.interpolation is not None and request.interpolation not in available_methods():
+        raise HTTPException(
+            status_code=400,
+            detail=f"interpolation must be one of: {', '.join(available_methods())}."
+        )
+    if request.keyframes is not None and request.keyframes < 2:
+        raise HTTPException(
+            status_code=400,
+            detail="keyframes must be at least 2."
+        )
+    client_id = get_client_id(http_request)
+    # Video is metered by the frames the model generates rather than by image cost
+    await enforce_rate_limit(client_id, video_frames=len(video_frame_plan(request)[2]))
     try:
         # Create a unique job ID
         job_id = str(uuid.uuid4())
         
-        # Initialize job status
-        video_jobs[job_id] = {
-            "status": "processing",
+        # Queue the job; it keeps everything needed to run it, so any worker can pick it up or resume it
+        await video_jobs.create(job_id, {
+            "status": "queued",
             "progress": 0,
-            "frames": [],
-            "error": None
-        }
+            "error": None,
+            "response_format": request.response_format,
+            "request": request.dict(),
+            "client_id": client_id
+        })
+        video_queue_ready.set()
         
-        # Start the video generation process in the background
-        asyncio.create_task(process_video_generation(job_id, request))
-        
-        return {"job_id": job_id, "status": "processing"}
+        return {"job_id": job_id, "status": "queued"}
     
     except Exception as e:
         error_message = str(e)
-        print(f"Error initiating video generation: {error_message}")
+        logger.error("Error initiating video generation: %s", error_message)
         raise HTTPException(
             status_code=500,
             detail=f"Error initiating video generation: {error_message}"
         )
 
-async def process_video_generation(job_id: str, request: VideoPromptRequest):
+async def video_job_worker():
+    """Claim queued (or abandoned) video jobs and run them, one at a time"""
+    while True:
+        try:
+            job = await video_jobs.claim(WORKER_ID, VIDEO_JOB_LEASE_SECONDS)
+        except Exception:
+            logger.exception("Error claiming a video job")
+            job = None
+        if job is None:
+            video_queue_ready.clear()
+            try:
+                await asyncio.wait_for(video_queue_ready.wait(), VIDEO_QUEUE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await run_video_job(job)
+
+async def run_video_job(job: dict):
+    """Run a claimed job, renewing its lease, and stop it if it is cancelled or the lease is lost"""
+    job_id = job["id"]
+    if job.get("attempts", 1) > VIDEO_JOB_MAX_ATTEMPTS:
+        await video_jobs.transition(job_id, RUNNABLE_STATUSES, status="failed", error="Video generation was interrupted too many times")
+        await video_jobs.release(job_id, WORKER_ID)
+        return
+
+    changed = video_jobs.subscribe(job_id)
+    task = asyncio.ensure_future(process_video_generation(job_id, VideoPromptRequest(**job["request"]), job.get("client_id", "internal")))
+    renew_interval = VIDEO_JOB_LEASE_SECONDS / 3
+    renewed_at = time.monotonic()
     try:
-        # Update job status
-        video_jobs[job_id]["status"] = "processing"
-        video_jobs[job_id]["progress"] = 10
-        
-        # Generate frames for the video
-        frames = await generate_video_frames(request.prompt, request.duration, request.style_preset)
+        while not task.done():
+            changed.clear()
+            waiter = asyncio.ensure_future(changed.wait())
+            try:
+                await asyncio.wait([task, waiter], timeout=renew_interval, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+            if task.done():
+                break
+            if changed.is_set():
+                # Local cancellations are seen straight away, other workers' ones at the next renewal
+                current = await video_jobs.get(job_id, include_frames=False)
+                if current is None or current["status"] == "cancelled":
+                    logger.info("Stopping cancelled video job %s", job_id, extra={"job_id": job_id})
+                    task.cancel()
+                    break
+            if time.monotonic() - renewed_at >= renew_interval:
+                # Renewal fails once the job is cancelled or another worker has taken it over
+                if not await video_jobs.renew(job_id, WORKER_ID, VIDEO_JOB_LEASE_SECONDS):
+                    logger.info("Stopping video job %s: cancelled or lease lost", job_id, extra={"job_id": job_id})
+                    task.cancel()
+                    break
+                renewed_at = time.monotonic()
+        await asyncio.gather(task, return_exceptions=True)
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        video_jobs.unsubscribe(job_id, changed)
+        await video_jobs.release(job_id, WORKER_ID)
+
+async def process_video_generation(job_id: str, request: VideoPromptRequest, client_id: str = "internal"):
+    encoder = None
+    try:
+        # Only a job that is still runnable is started; a DELETE may have cancelled it since it was claimed
+        if not await video_jobs.transition(job_id, RUNNABLE_STATUSES, status="processing", progress=10):
+            logger.info("Not starting video job %s: it was cancelled", job_id, extra={"job_id": job_id})
+            return
+
+        num_frames, method, generated = video_frame_plan(request)
+        if available_encoder(VIDEO_FORMAT, FFMPEG_BINARY):
+            encoder = VideoEncoder(num_frames, VIDEO_FPS, process_pool, VIDEO_FORMAT, FFMPEG_BINARY)
+
+        # Frames finished before a restart are kept; only the missing ones are generated again
+        stored = {
+            frame["index"]: frame for frame in await video_jobs.get_frames(job_id)
+            if image_store.exists(frame["id"])
+        }
+        if stored:
+            logger.info("Resuming video job %s with %d of %d frames", job_id, len(stored), num_frames, extra={"job_id": job_id})
+        frames = dict(stored)
+        counts = {"frames_completed": len(stored), "frames_failed": 0}
+        await video_jobs.update(job_id, frames_total=num_frames, progress=10 + (80 * len(stored)) // num_frames, **counts)
+        if encoder:
+            for index, frame in stored.items():
+                await encoder.add_frame(index, image_store.path(frame["id"]))
         
-        # Update job status
-        video_jobs[job_id]["progress"] = 50
-        video_jobs[job_id]["frames"] = frames
+        # Indices already counted and handed to the encoder, which must not be filled a second time
+        reported = set()
+
+        async def on_frame(index: int, frame: dict):
+            reported.add(index)
+            if frame:
+                counts["frames_completed"] += 1
+                frames[index] = frame
+                await video_jobs.add_frame(job_id, index, {**frame, "index": index})
+            else:
+                counts["frames_failed"] += 1
+            # Frame generation covers 10-90%, encoding the rest
+            done = counts["frames_completed"] + counts["frames_failed"]
+            await video_jobs.update(job_id, progress=10 + (80 * done) // num_frames, **counts)
+            if encoder:
+                # Frames are streamed into the encoder as they finish
+                await encoder.add_frame(index, image_store.path(frame["id"]) if frame else None)
+
+        async def on_keyframe(index: int, frame: dict):
+            if not frame:
+                # A failed keyframe is interpolated from its neighbours along with the other frames
+                return
+            await on_frame(index, frame)
+            before = max((i for i in frames if i < index), default=None)
+            if before is not None:
+                # Keyframes come one at a time, so the gap behind this one is filled while the next is generated
+                gap = [i for i in range(before + 1, index) if i not in frames]
+                segments.append(asyncio.create_task(interpolate_video_frames(frames, num_frames, method, on_frame, gap)))
+
+        # Generate frames for the video. They always go to the image store so the job only keeps references.
+        segments = []
+        try:
+            if method == "none":
+                missing = [index for index in generated if index not in stored]
+                await generate_video_frames(request.prompt, request.duration, request.style_preset, request.use_cache, client_id, "url", on_frame, missing)
+            else:
+                await generate_keyframes(request.prompt, request.style_preset, request.use_cache, client_id, generated, frames, on_keyframe)
+                await asyncio.gather(*segments)
+        finally:
+            for segment in segments:
+                segment.cancel()
+        if not counts["frames_completed"]:
+            raise Exception("No frames were generated for the video")
+        if method != "none":
+            # Whatever is still missing: failed keyframes, frames past a failed first or last keyframe, or gaps
+            # left by a restart. Frames of a gap whose interpolation failed were already reported as failed.
+            missing = [index for index in range(num_frames) if index not in frames and index not in reported]
+            await interpolate_video_frames(frames, num_frames, method, on_frame, missing)
         
-        # Simulate video processing (in a real implementation, you would use a video processing library)
-        # For now, we'll just return the frames as a sequence
-        video_jobs[job_id]["status"] = "completed"
-        video_jobs[job_id]["progress"] = 100
+        if encoder:
+            try:
+                video = await encoder.finish()
+                video_id = await asyncio.to_thread(image_store.put, video, encoder.format)
+                await video_jobs.update(job_id, video={
+                    "id": video_id,
+                    "url": f"/videos/{video_id}",
+                    "content_type": encoder.content_type,
+                    "bytes": len(video),
+                    "fps": VIDEO_FPS,
+                    "frames": encoder.frames_written
+                })
+            except Exception as e:
+                # The frames are still available, so report them instead of failing the job
+                logger.error("Error encoding video: %s", e, extra={"job_id": job_id})
+                await encoder.abort()
+
+        # A cancellation that lands after the last frame wins over completing the job
+        await video_jobs.transition(job_id, ("processing",), status="completed", progress=100)
         
+    except asyncio.CancelledError:
+        # Cancelled by the user or interrupted by shutdown; stored frames are kept for a resume
+        if encoder:
+            await encoder.abort()
+        raise
     except Exception as e:
         error_message = str(e)
-        print(f"Error in video generation process: {error_message}")
-        video_jobs[job_id]["status"] = "failed"
-        video_jobs[job_id]["error"] = error_message
+        logger.error("Error in video generation process: %s", error_message, extra={"job_id": job_id})
+        if encoder:
+            await encoder.abort()
+        await video_jobs.transition(job_id, ("processing",), status="failed", error=error_message)
+
+async def render_frames(frames: list, response_format: str) -> list:
+    """Turn stored frame references back into the representation the job was requested with"""
+    if response_format == "url":
+        return frames
+    rendered = []
+    for frame in frames:
+        data = await asyncio.to_thread(image_store.read, frame["id"])
+        if data is None:
+            # Expired from the image store
+            continue
+        metadata = {k: v for k, v in frame.items() if k not in ("id", "url", "content_type", "bytes", "variants")}
+        rendered.append({"base64": base64.b64encode(data).decode("ascii"), **metadata})
+    return rendered
 
 @app.get("/video-status/{job_id}")
-async def get_video_status(job_id: str):
-    if job_id not in video_jobs:
+async def get_video_status(job_id: str, include_frames: bool = True):
+    job = await video_jobs.get(job_id, include_frames=False)
+    if job is None:
         raise HTTPException(
             status_code=404,
             detail="Video job not found"
         )
     
-    job = video_jobs[job_id]
-    
     if job["status"] == "completed":
-        return {
+        response = {
             "status": "completed",
-            "progress": 100,
-            "frames": job["frames"]
+            "progress": 100
         }
+        if job.get("video"):
+            response["video"] = job["video"]
+        # Frames stay in the response by default, as the frontend plays them; clients that only
+        # need the encoded video can pass include_frames=false. Without a video they are the result.
+        if include_frames or not job.get("video"):
+            job = await video_jobs.get(job_id)
+            response["frames"] = await render_frames(job["frames"], job.get("response_format", "base64"))
+        return response
     elif job["status"] == "failed":
         return {
             "status": "failed",
             "error": job["error"]
         }
+    elif job["status"] == "cancelled":
+        return {
+            "status": "cancelled",
+            "frames_completed": job.get("frames_completed", 0)
+        }
     else:
+        # Queued or processing
         return {
-            "status": "processing",
-            "progress": job["progress"]
+            "status": job["status"],
+            "progress": job["progress"],
+            "frames_total": job.get("frames_total"),
+            "frames_completed": job.get("frames_completed", 0),
+            "frames_failed": job.get("frames_failed", 0)
         }
 
+@app.delete("/video-jobs/{job_id}")
+async def delete_video_job(job_id: str):
+    """Cancel a queued or running video job, or remove a finished one"""
+    job = await video_jobs.get(job_id, include_frames=False)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Video job not found"
+        )
+    # A queued or running job is cancelled, checking the status as it is written so a job that finished
+    # in the meantime is not marked cancelled. Its worker sees the change and stops; frames stay readable.
+    if await video_jobs.transition(job_id, RUNNABLE_STATUSES, status="cancelled"):
+        return {"job_id": job_id, "status": "cancelled"}
+    await video_jobs.delete(job_id)
+    return {"job_id": job_id, "status": "deleted"}
+
+@app.get("/video-jobs/{job_id}/frames")
+async def get_video_frames(job_id: str, start: int = 0, end: int = None):
+    """Return the frames finished so far with start <= index < end, while the job is still running or after"""
+    if start < 0 or (end is not None and end < start):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid frame range"
+        )
+    job = await video_jobs.get(job_id, include_frames=False)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Video job not found"
+        )
+    frames = await video_jobs.get_frames(job_id, start, end)
+    return {
+        "status": job["status"],
+        "frames_total": job.get("frames_total"),
+        "frames_completed": job.get("frames_completed", 0),
+        "frames": await render_frames(frames, job.get("response_format", "base64"))
+    }
+
+@app.get("/video-events/{job_id}")
+async def stream_video_events(job_id: str, http_request: Request):
+    """Push job progress as Server-Sent Events so clients do not have to poll /video-status"""
+    if await video_jobs.get(job_id, include_frames=False) is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Video job not found"
+        )
+
+    async def event_stream():
+        changed = video_jobs.subscribe(job_id)
+        sent_frames = set()
+        last_progress = None
+        try:
+            while True:
+                changed.clear()
+                job = await video_jobs.get(job_id, include_frames=False)
+                if job is None:
+                    yield format_stream_event("failed", {"error": "Video job not found"}, True)
+                    return
+
+                if job.get("frames_completed", 0) > len(sent_frames):
+                    # Frame events carry references only; fetch the image from its URL
+                    for frame in await video_jobs.get_frames(job_id):
+                        if frame["index"] not in sent_frames:
+                            sent_frames.add(frame["index"])
+                            yield format_stream_event("frame", {"index": frame["index"], "frame": frame}, True)
+
+                progress = (job["progress"], job.get("frames_completed", 0), job.get("frames_failed", 0))
+                if progress != last_progress:
+                    last_progress = progress
+                    yield format_stream_event("progress", {
+                        "progress": job["progress"],
+                        "frames_total": job.get("frames_total"),
+                        "frames_completed": job.get("frames_completed", 0),
+                        "frames_failed": job.get("frames_failed", 0)
+                    }, True)
+
+                if job["status"] == "completed":
+                    yield format_stream_event("completed", {"video": job.get("video")}, True)
+                    return
+                if job["status"] == "failed":
+                    yield format_stream_event("failed", {"error": job["error"]}, True)
+                    return
+                if job["status"] == "cancelled":
+                    yield format_stream_event("cancelled", {}, True)
+                    return
+                if await http_request.is_disconnected():
+                    return
+
+                try:
+                    await asyncio.wait_for(changed.wait(), VIDEO_EVENTS_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            video_jobs.unsubscribe(job_id, changed)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def describe_validation_error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors())
+
+async def start_bulk_job(items: list, output: str, use_cache: bool, client_id: str) -> dict:
+    """Validate every item up front, then queue the accepted ones as one bulk job.
+
+    Items that fail validation (bad fields, filtered words, image counts) are
+    reported in the job's results and skipped instead of rejecting the upload.
+    """
+    if output not in OUTPUT_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail="output must be either 'files' or 'zip'."
+        )
+    if not items:
+        raise HTTPException(
+            status_code=400,
+            detail="No prompts were given."
+        )
+
+    accepted = []
+    rejected = []
+    for index, item in enumerate(items):
+        try:
+            request = item if isinstance(item, PromptRequest) else PromptRequest(**item)
+            validate_prompt_request(request)
+            limit = rate_limiter.exceeds_burst({"image_units": request_image_cost(request.platform, request.quality)})
+            if limit is not None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"A single image of this size is larger than the {limit.name} limit."
+                )
+            accepted.append((index, request))
+        except ValidationError as e:
+            rejected.append({"item": index, "error": describe_validation_error(e)})
+        except HTTPException as e:
+            rejected.append({"item": index, "error": e.detail})
+    if not accepted:
+        raise HTTPException(
+            status_code=400,
+            detail=f"None of the prompts can be generated. Item {rejected[0]['item']}: {rejected[0]['error']}"
+        )
+    images_total = sum(request.num_images for _, request in accepted)
+    if images_total > BULK_MAX_IMAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A bulk job cannot exceed {BULK_MAX_IMAGES} images; this one has {images_total}."
+        )
+
+    job_id = str(uuid.uuid4())
+    bulk_output = BulkOutput(os.path.join(BULK_OUTPUT_DIR, job_id), output)
+    for entry in rejected:
+        await asyncio.to_thread(bulk_output.append_result, entry)
+    await bulk_jobs.create(job_id, {
+        "status": "queued",
+        "progress": 0,
+        "error": None,
+        "output": output,
+        "items_total": len(items),
+        "items_rejected": len(rejected),
+        "images_total": images_total,
+        "images_completed": 0,
+        "images_failed": 0,
+        "client_id": client_id
+    })
+    task = asyncio.create_task(run_bulk_job(job_id, accepted, bulk_output, use_cache, client_id))
+    bulk_tasks[job_id] = task
+    task.add_done_callback(lambda _: bulk_tasks.pop(job_id, None))
+
+    logger.info(
+        "Queued bulk job %s with %d images from %d prompts", job_id, images_total, len(accepted),
+        extra={"job_id": job_id, "client_id": client_id}
+    )
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "items_accepted": len(accepted),
+        "items_rejected": len(rejected),
+        "images_total": images_total
+    }
+
+async def run_bulk_job(job_id: str, items: list, bulk_output: BulkOutput, use_cache: bool, client_id: str):
+    """Generate every image of a bulk job at bulk priority, writing each one out as soon as it is ready.
+
+    Only BULK_MAX_IN_FLIGHT images wait on the scheduler at a time, in item
+    order, so seeds of the same prompt are queued together and can share
+    multi-sample calls.
+    """
+    counts = {"images_completed": 0, "images_failed": 0}
+    images_total = sum(request.num_images for _, request in items)
+    slots = asyncio.Semaphore(BULK_MAX_IN_FLIGHT)
+    tasks = []
+
+    async def generate(index: int, request: PromptRequest, seed: int):
+        try:
+            image = await generate_single_image(request.prompt, seed, request.platform, request.style_preset, use_cache and request.use_cache, "raw", client_id, PRIORITY_BULK, request.quality)
+            if not image:
+                raise ValueError("No image was returned for this seed.")
+            data = image.pop("data")
+            filename = await asyncio.to_thread(bulk_output.write_image, index, seed, data)
+            entry = {"item": index, "prompt": request.prompt, "file": filename, **image}
+            counts["images_completed"] += 1
+        except Exception as e:
+            logger.error("Error generating bulk image %d/%d: %s", index, seed, e, extra={"job_id": job_id})
+            entry = {"item": index, "prompt": request.prompt, "seed": seed, "error": describe_image_error(e)}
+            counts["images_failed"] += 1
+        finally:
+            slots.release()
+        await asyncio.to_thread(bulk_output.append_result, entry)
+        done = counts["images_completed"] + counts["images_failed"]
+        await bulk_jobs.update(job_id, progress=(100 * done) // images_total, **counts)
+
+    try:
+        await bulk_jobs.update(job_id, status="processing")
+        for index, request in items:
+            # Picks up cancellations made through other workers between prompts
+            job = await bulk_jobs.get(job_id, include_frames=False)
+            if job is None or job["status"] == "cancelled":
+                raise asyncio.CancelledError()
+            cost = request_image_cost(request.platform, request.quality)
+            for seed in map(image_seed, range(request.num_images)):
+                # Bulk jobs draw from the client's rate limit too, but wait for tokens instead of failing
+                while retry_after := await rate_limiter.acquire(client_id, {"image_units": cost}):
+                    await asyncio.sleep(retry_after)
+                await slots.acquire()
+                tasks.append(asyncio.create_task(generate(index, request, seed)))
+        await asyncio.gather(*tasks)
+        job = await bulk_jobs.get(job_id, include_frames=False)
+        if job is None or job["status"] == "cancelled":
+            raise asyncio.CancelledError()
+
+        await asyncio.to_thread(bulk_output.close)
+        await bulk_jobs.update(job_id, status="completed", progress=100)
+        logger.info("Bulk job %s finished: %d images, %d failed", job_id, counts["images_completed"], counts["images_failed"], extra={"job_id": job_id})
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.to_thread(bulk_output.abort)
+        job = await bulk_jobs.get(job_id, include_frames=False)
+        if job is not None and job["status"] != "cancelled":
+            await bulk_jobs.update(job_id, status="failed", error="The server stopped before the job finished")
+    except Exception as e:
+        logger.error("Error in bulk job: %s", e, extra={"job_id": job_id})
+        await asyncio.to_thread(bulk_output.abort)
+        await bulk_jobs.update(job_id, status="failed", error=str(e))
+
+@app.post("/bulk-jobs")
+async def create_bulk_job(request: BulkRequest, http_request: Request):
+    """Queue a list of prompts for offline generation and return a job handle"""
+    return await start_bulk_job(request.items, request.output, request.use_cache, get_client_id(http_request))
+
+@app.post("/bulk-jobs/upload")
+async def upload_bulk_job(http_request: Request, file: UploadFile = File(...), output: str = Form("files"), use_cache: bool = Form(True)):
+    """Queue prompts from an uploaded JSON Lines file (or a JSON array) of /generate-images bodies"""
+    try:
+        items = parse_bulk_items(await file.read())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Could not read the uploaded prompts: {e}"
+        )
+    return await start_bulk_job(items, output, use_cache, get_client_id(http_request))
+
+async def get_bulk_job_or_404(job_id: str) -> dict:
+    job = await bulk_jobs.get(job_id, include_frames=False) if JOB_ID_PATTERN.match(job_id) else None
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Bulk job not found"
+        )
+    return job
+
+@app.get("/bulk-jobs/{job_id}")
+async def get_bulk_job(job_id: str):
+    job = await get_bulk_job_or_404(job_id)
+    response = {
+        "job_id": job_id,
+        "status": job["status"],
+        "progress": job["progress"],
+        "output": job["output"],
+        "items_total": job["items_total"],
+        "items_rejected": job["items_rejected"],
+        "images_total": job["images_total"],
+        "images_completed": job["images_completed"],
+        "images_failed": job["images_failed"],
+        "results_url": f"/bulk-jobs/{job_id}/results"
+    }
+    if job["output"] == "zip" and job["status"] == "completed":
+        response["archive_url"] = f"/bulk-jobs/{job_id}/files/images.zip"
+    if job["status"] == "failed":
+        response["error"] = job["error"]
+    return response
+
+@app.get("/bulk-jobs/{job_id}/results")
+async def get_bulk_job_results(job_id: str, start: int = 0, end: int = None):
+    """Return result entries written so far (start <= n < end), one per image or rejected item"""
+    if start < 0 or (end is not None and end < start):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid result range"
+        )
+    job = await get_bulk_job_or_404(job_id)
+    results = await asyncio.to_thread(BulkOutput(os.path.join(BULK_OUTPUT_DIR, job_id), job["output"]).read_results, start, end)
+    if job["output"] == "files":
+        for entry in results:
+            if "file" in entry:
+                entry["url"] = f"/bulk-jobs/{job_id}/files/{entry['file']}"
+    return {"status": job["status"], "results": results}
+
+@app.get("/bulk-jobs/{job_id}/files/{filename}")
+async def get_bulk_job_file(job_id: str, filename: str):
+    """Download one generated image, the results manifest or the zip archive of a bulk job"""
+    job = await get_bulk_job_or_404(job_id)
+    path = BulkOutput(os.path.join(BULK_OUTPUT_DIR, job_id), job["output"]).path(filename)
+    if path is None:
+        raise HTTPException(
+            status_code=404,
+            detail="File not found"
+        )
+    media_types = {".png": "image/png", ".zip": "application/zip", ".jsonl": "application/x-ndjson"}
+    return FileResponse(path, media_type=media_types.get(os.path.splitext(filename)[1], "application/octet-stream"), filename=filename)
+
+@app.delete("/bulk-jobs/{job_id}")
+async def delete_bulk_job(job_id: str):
+    """Cancel a queued or running bulk job, or remove a finished one with its output"""
+    job = await get_bulk_job_or_404(job_id)
+    if job["status"] in ("queued", "processing"):
+        # Images already written are kept until the job is deleted or expires
+        await bulk_jobs.update(job_id, status="cancelled")
+        task = bulk_tasks.get(job_id)
+        if task:
+            task.cancel()
+        return {"job_id": job_id, "status": "cancelled"}
+    await bulk_jobs.delete(job_id)
+    await asyncio.to_thread(BulkOutput(os.path.join(BULK_OUTPUT_DIR, job_id), job["output"]).delete)
+    return {"job_id": job_id, "status": "deleted"}
+
+def parse_byte_range(range_header: str, size: int):
+    """Parse a single-range "bytes=start-end" header into inclusive offsets, or None if unsatisfiable"""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start_str, _, end_str = spec.strip().partition("-")
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else size - 1
+        else:
+            # Suffix range: the last N bytes
+            length = int(end_str)
+            if length <= 0:
+                return None
+            start, end = max(0, size - length), size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        return None
+    return start, end
+
+def read_file_range(path: str, start: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(length)
+
+@app.get("/images/{image_id}")
+async def get_image(image_id: str, http_request: Request, format: str = None, variant: str = "full"):
+    """Serve a stored image as raw bytes, resized to a variant and transcoded to WebP/AVIF when the client accepts it"""
+    try:
+        fmt = negotiate_format(http_request.headers.get("accept", ""), format)
+        path = await image_processor.get_path(image_id, variant, fmt)
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=400,
+            detail=str(ve)
+        )
+
+    if path is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Image not found"
+        )
+
+    # Images are content-addressed, so the ID doubles as a strong validator
+    return await serve_stored_file(path, CONTENT_TYPES[fmt], f'"{image_id}-{variant}-{fmt}"', http_request, vary="Accept")
+
+@app.get("/videos/{video_id}")
+async def get_video(video_id: str, http_request: Request):
+    """Serve an encoded video, with Range support so players can seek"""
+    for fmt in VIDEO_FORMATS:
+        if image_store.exists(video_id, fmt):
+            path = image_store.path(video_id, fmt)
+            return await serve_stored_file(path, CONTENT_TYPES[fmt], f'"{video_id}-{fmt}"', http_request)
+    raise HTTPException(
+        status_code=404,
+        detail="Video not found"
+    )
+
+async def serve_stored_file(path: str, content_type: str, etag: str, http_request: Request, vary: str = None) -> Response:
+    """Serve an immutable file with ETag revalidation and single byte-range support"""
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=31536000, immutable"
+    }
+    if vary:
+        headers["Vary"] = vary
+    if etag in http_request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    size = os.path.getsize(path)
+    range_header = http_request.headers.get("range")
+    if range_header:
+        byte_range = parse_byte_range(range_header, size)
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        start, end = byte_range
+        content = await asyncio.to_thread(read_file_range, path, start, end - start + 1)
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return Response(content=content, status_code=206, media_type=content_type, headers=headers)
+
+    content = await asyncio.to_thread(read_file_range, path, 0, size)
+    return Response(content=content, media_type=content_type, headers=headers)
+
+@app.get("/ready")
+async def get_ready():
+    """Readiness probe: 503 until the background warm-up has finished"""
+    return TimedJSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+def require_admin(http_request: Request):
+    """Reject requests without the X-Admin-Key header; guards /admin and the internal stats endpoints"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin endpoints are disabled. Set ADMIN_API_KEY to enable them."
+        )
+    if not secrets.compare_digest(http_request.headers.get("x-admin-key", ""), ADMIN_API_KEY):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid admin key"
+        )
+
+@app.get("/cache-stats", dependencies=[Depends(require_admin)])
+async def get_cache_stats():
+    return image_cache.stats()
+
+@app.get("/scheduler-stats", dependencies=[Depends(require_admin)])
+async def get_scheduler_stats():
+    return scheduler.stats()
+
+@app.get("/inflight-stats", dependencies=[Depends(require_admin)])
+async def get_inflight_stats():
+    return inflight_generations.stats()
+
+@app.get("/batch-stats", dependencies=[Depends(require_admin)])
+async def get_batch_stats():
+    return {"max_samples": model_router.max_samples, **generation_batcher.stats()}
+
+@app.get("/model-stats", dependencies=[Depends(require_admin)])
+async def get_model_stats():
+    return model_router.stats()
+
+@app.get("/image-processing-stats", dependencies=[Depends(require_admin)])
+async def get_image_processing_stats():
+    return {**image_processor.stats(), "pool": process_pool.stats()}
+
+@app.get("/bedrock-stats", dependencies=[Depends(require_admin)])
+async def get_bedrock_stats():
+    return bedrock.stats()
+
+@app.get("/video-job-stats", dependencies=[Depends(require_admin)])
+async def get_video_job_stats():
+    return {"jobs": await video_jobs.count(), "worker_id": WORKER_ID, "workers": len(video_workers)}
+
+@app.get("/admin/usage", dependencies=[Depends(require_admin)])
+async def get_usage(client_id: str = None):
+    """Rate limit settings, and consumption, rejections and remaining tokens per client"""
+    return await rate_limiter.usage(client_id)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    metrics.VIDEO_JOBS.set(await video_jobs.count())
+    body, content_type = metrics.render_latest()
+    return Response(content=body, headers={"Content-Type": content_type})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,125 @@
+import contextlib
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+try:
+    from opentelemetry import trace
+except ImportError:  # OpenTelemetry is optional, spans are skipped without it
+    trace = None
+
+TRACING_ENABLED = trace is not None and os.getenv("OTEL_TRACING_ENABLED", "false").lower() == "true"
+_tracer = trace.get_tracer("ai-image-generator") if TRACING_ENABLED else None
+
+# Labels taken from requests are limited to known values and everything else is counted as "other",
+# so clients cannot create new time series at will
+PLATFORM_LABELS = {"mobile", "desktop", "web"}
+STYLE_PRESET_LABELS = {
+    "3d-model", "analog-film", "anime", "cinematic", "comic-book", "digital-art", "enhance", "fantasy-art",
+    "isometric", "line-art", "low-poly", "modeling-compound", "neon-punk", "origami", "photographic",
+    "pixel-art", "tile-texture", "watercolor", "oil-painting", "sketch",
+}
+METHOD_LABELS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+# Buckets cover both millisecond-scale local stages and multi-second Bedrock calls
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+GENERATION_STAGE_SECONDS = Histogram(
+    "generation_stage_seconds",
+    "Time spent in each stage of generating one image",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request until its response has been sent",
+    ["method", "route", "status"],
+    buckets=STAGE_BUCKETS,
+)
+IMAGES_TOTAL = Counter(
+    "images_generated_total",
+    "Images requested from generate_single_image, by outcome",
+    ["platform", "style_preset", "outcome"],
+)
+BEDROCK_REQUESTS_TOTAL = Counter(
+    "bedrock_requests_total",
+    "InvokeModel attempts by result",
+    ["result"],
+)
+MODEL_CALLS_TOTAL = Counter(
+    "model_calls_total",
+    "Generation calls per model backend, after the client's own retries",
+    ["model", "result"],
+)
+RATE_LIMITED_TOTAL = Counter(
+    "rate_limited_requests_total",
+    "Requests rejected with 429 by the per-client rate limits, by metered resource",
+    ["resource"],
+)
+BEDROCK_IN_FLIGHT = Gauge("bedrock_in_flight", "Bedrock calls currently running")
+SCHEDULER_QUEUE_DEPTH = Gauge("scheduler_queue_depth", "Generations waiting for a scheduler slot", ["priority"])
+VIDEO_JOBS = Gauge("video_jobs", "Video jobs held in the job store")
+
+
+def bounded_label(value: str, known: set) -> str:
+    return value if value in known else "other"
+
+
+def count_image(platform: str, style_preset: str, outcome: str):
+    IMAGES_TOTAL.labels(bounded_label(platform, PLATFORM_LABELS), bounded_label(style_preset, STYLE_PRESET_LABELS), outcome).inc()
+
+
+def observe_stage(stage: str, seconds: float):
+    GENERATION_STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+@contextlib.contextmanager
+def stage(name: str, **attributes):
+    """Time a block into generation_stage_seconds and, when tracing is enabled, wrap it in a span"""
+    span = _tracer.start_as_current_span(name, attributes=attributes) if _tracer else contextlib.nullcontext()
+    started = time.perf_counter()
+    with span:
+        try:
+            yield
+        finally:
+            GENERATION_STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+def render_latest() -> tuple:
+    """Return the Prometheus exposition body and its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template.
+
+    Timing stops when the last body chunk is sent, so streaming responses are
+    measured end to end.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                bounded_label(scope["method"], METHOD_LABELS),
+                route.path if route is not None else "unmatched",
+                str(status["code"]),
+            ).observe(time.perf_counter() - started)
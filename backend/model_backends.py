@@ -0,0 +1,187 @@
+import asyncio
+import base64
+import json
+
+from placeholder_images import make_png
+
+# Sizes Titan Image Generator v1 accepts that are closest to the platform presets
+TITAN_SIZES = [(1024, 1024), (768, 768), (512, 512), (768, 1152), (1152, 768), (896, 1152), (1152, 896), (768, 1280), (1280, 768)]
+# SD3 takes an aspect ratio instead of a size
+SD3_ASPECT_RATIOS = {"1:1": 1.0, "5:4": 5 / 4, "4:5": 4 / 5, "3:2": 3 / 2, "2:3": 2 / 3, "16:9": 16 / 9, "9:16": 9 / 16}
+
+
+class ModelBackend:
+    """One text-to-image model: how to build its request and read its response.
+
+    ``params`` is the model-independent description of an image (prompt, width,
+    height, style_preset, cfg_scale, steps). With ``init_image`` (base64 PNG)
+    and ``image_strength`` (0-1, how closely to follow it) the image is drawn
+    from that image rather than from noise. Responses are parsed into
+    ``(seed, base64_png)`` pairs so callers can map artifacts back to requests.
+    """
+
+    name = None
+    model_id = None
+    # Most models take one seed per call, so one call can only serve one seed
+    max_samples = 1
+    # Only used once every other backend is unavailable
+    fallback_only = False
+
+    def __init__(self, cost_per_image: float, max_samples: int = None):
+        self.cost_per_image = cost_per_image
+        if max_samples is not None:
+            self.max_samples = max_samples
+
+    def build_request(self, params: dict, seeds: list) -> dict:
+        raise NotImplementedError
+
+    def parse_response(self, response: dict, seeds: list) -> list:
+        raise NotImplementedError
+
+    async def generate(self, client, params: dict, seeds: list, max_retries: int = None) -> list:
+        """Invoke the model for consecutive seeds and return (seed, base64) pairs"""
+        response = await client.invoke_model(
+            self.model_id,
+            json.dumps(self.build_request(params, seeds)),
+            content_type="application/json",
+            accept="application/json",
+            max_retries=max_retries
+        )
+        return self.parse_response(response, seeds)
+
+
+class SDXLBackend(ModelBackend):
+    name = "sdxl"
+    model_id = "stability.stable-diffusion-xl-v1"
+
+    def build_request(self, params: dict, seeds: list) -> dict:
+        body = {
+            "text_prompts": [
+                {
+                    "text": params["prompt"],
+                    "weight": 1.0
+                }
+            ],
+            "cfg_scale": params["cfg_scale"],
+            "steps": params["steps"],
+            "width": params["width"],
+            "height": params["height"],
+            "seed": seeds[0],
+            "style_preset": params["style_preset"]
+        }
+        if params.get("init_image"):
+            # Image-to-image takes its size from the init image
+            del body["width"], body["height"]
+            body["init_image"] = params["init_image"]
+            body["init_image_mode"] = "IMAGE_STRENGTH"
+            body["image_strength"] = params["image_strength"]
+        if len(seeds) > 1:
+            # Multi-sample responses hold one artifact per consecutive seed, each tagged with its seed
+            body["samples"] = len(seeds)
+        return body
+
+    def parse_response(self, response: dict, seeds: list) -> list:
+        return [
+            (artifact.get("seed", seeds[0] + index), artifact["base64"])
+            for index, artifact in enumerate(response.get("artifacts") or [])
+        ]
+
+
+class TitanImageBackend(ModelBackend):
+    """Amazon Titan Image Generator. numberOfImages shares one seed, so each call serves one seed."""
+
+    name = "titan"
+    model_id = "amazon.titan-image-generator-v1"
+
+    def build_request(self, params: dict, seeds: list) -> dict:
+        width, height = min(
+            TITAN_SIZES,
+            key=lambda size: (abs(size[0] / size[1] - params["width"] / params["height"]), abs(size[0] * size[1] - params["width"] * params["height"]))
+        )
+        body = {
+            "taskType": "TEXT_IMAGE",
+            "textToImageParams": {"text": params["prompt"]},
+            "imageGenerationConfig": {
+                "numberOfImages": 1,
+                "width": width,
+                "height": height,
+                "cfgScale": params["cfg_scale"],
+                "seed": seeds[0]
+            }
+        }
+        if params.get("init_image"):
+            del body["textToImageParams"]
+            body["taskType"] = "IMAGE_VARIATION"
+            body["imageVariationParams"] = {
+                "text": params["prompt"],
+                "images": [params["init_image"]],
+                # Titan accepts 0.2-1.0
+                "similarityStrength": min(1.0, max(0.2, params["image_strength"]))
+            }
+        return body
+
+    def parse_response(self, response: dict, seeds: list) -> list:
+        return list(zip(seeds, response.get("images") or []))
+
+
+class SD3Backend(ModelBackend):
+    name = "sd3"
+    model_id = "stability.sd3-large-v1:0"
+
+    def build_request(self, params: dict, seeds: list) -> dict:
+        if params.get("init_image"):
+            return {
+                "prompt": params["prompt"],
+                "mode": "image-to-image",
+                "image": params["init_image"],
+                # SD3's strength is how far to move away from the image
+                "strength": 1.0 - params["image_strength"],
+                "seed": seeds[0],
+                "output_format": "png"
+            }
+        ratio = params["width"] / params["height"]
+        return {
+            "prompt": params["prompt"],
+            "mode": "text-to-image",
+            "aspect_ratio": min(SD3_ASPECT_RATIOS, key=lambda name: abs(SD3_ASPECT_RATIOS[name] - ratio)),
+            "seed": seeds[0],
+            "output_format": "png"
+        }
+
+    def parse_response(self, response: dict, seeds: list) -> list:
+        images = response.get("images") or []
+        reported = response.get("seeds") or seeds
+        reasons = response.get("finish_reasons") or [None] * len(images)
+        # A finish reason is only set when the image was filtered or failed
+        return [(seed, image) for seed, image, reason in zip(reported, images, reasons) if reason is None]
+
+
+class LocalStubBackend(ModelBackend):
+    """Renders placeholder images in-process, for development and as a last-resort fallback"""
+
+    name = "local"
+    model_id = "local"
+    max_samples = 16
+    fallback_only = True
+
+    async def generate(self, client, params: dict, seeds: list, max_retries: int = None) -> list:
+        return await asyncio.to_thread(self._render, params, seeds)
+
+    def _render(self, params: dict, seeds: list) -> list:
+        if params.get("init_image"):
+            # Placeholders have nothing to vary, so image-to-image returns the image unchanged
+            return [(seed, params["init_image"]) for seed in seeds]
+        return [(seed, base64.b64encode(make_png(params["width"], params["height"], seed)).decode("ascii")) for seed in seeds]
+
+
+BACKENDS = {backend.name: backend for backend in (SDXLBackend, TitanImageBackend, SD3Backend, LocalStubBackend)}
+
+# On-demand USD price per standard 1024x1024 image, used when no cost is configured
+DEFAULT_COSTS = {"sdxl": 0.04, "titan": 0.01, "sd3": 0.08, "local": 0.0}
+
+
+def create_backend(name: str, cost_per_image: float = None, max_samples: int = None) -> ModelBackend:
+    """Instantiate a registered backend by name ("sdxl", "titan", "sd3" or "local")"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown model backend: {name}")
+    return BACKENDS[name](DEFAULT_COSTS[name] if cost_per_image is None else cost_per_image, max_samples)
@@ -0,0 +1,135 @@
+import random
+import time
+
+import httpx
+
+from bedrock_client import BedrockError
+
+# Errors that say the model itself is unavailable to us, rather than that the request was bad
+FAILOVER_STATUS_CODES = {403, 404, 408, 424}
+
+
+def is_backend_failure(error: Exception) -> bool:
+    """Whether an error should count against the model and be retried on another one"""
+    if isinstance(error, BedrockError):
+        return error.throttled or error.status_code >= 500 or error.status_code in FAILOVER_STATUS_CODES
+    return isinstance(error, httpx.TransportError)
+
+
+class _BackendState:
+    __slots__ = ("latency", "error_rate", "consecutive_failures", "cooldown_until", "calls", "failures", "throttles")
+
+    def __init__(self):
+        self.latency = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.throttles = 0
+
+
+class ModelRouter:
+    """Pick a model backend per call from observed latency, error rate and cost.
+
+    Backends are given in order of preference. Each is scored as its average
+    call latency, inflated by its recent error rate, plus its price per image
+    times cost_weight (seconds per USD), plus preference_seconds for every
+    backend listed before it. The lowest score wins, so a later backend only
+    takes over when the ones before it are that much slower or failing.
+    A throttled backend, or one that has failed failure_threshold times in a
+    row, sits out for cooldown_seconds. A small share of calls goes to a
+    random backend so every estimate stays current. Fallback-only backends
+    (the local placeholder renderer) are never scored or explored, only used
+    when every other backend is cooling down or has been tried.
+    """
+
+    def __init__(self, backends: list, cost_weight: float = 10.0, explore_rate: float = 0.05,
+                 cooldown_seconds: float = 30.0, failure_threshold: int = 3, smoothing: float = 0.2,
+                 preference_seconds: float = 30.0):
+        if not backends:
+            raise ValueError("At least one model backend is required")
+        self.backends = backends
+        self.cost_weight = cost_weight
+        self.explore_rate = explore_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.failure_threshold = failure_threshold
+        self.smoothing = smoothing
+        self.preference_seconds = preference_seconds
+        self._position = {backend.name: position for position, backend in enumerate(backends)}
+        self._state = {backend.name: _BackendState() for backend in backends}
+        self.failovers = 0
+
+    @property
+    def preferred(self):
+        """The first configured backend, whose images are the ones that get cached"""
+        return self.backends[0]
+
+    @property
+    def max_samples(self) -> int:
+        return max(backend.max_samples for backend in self.backends)
+
+    def score(self, backend) -> float:
+        state = self._state[backend.name]
+        latency = (state.latency or 0.0) / max(0.05, 1.0 - state.error_rate)
+        return latency + self.cost_weight * backend.cost_per_image + self.preference_seconds * self._position[backend.name]
+
+    def choose(self, exclude=()):
+        """Return the backend to use next, or None when every backend has been excluded"""
+        candidates = [backend for backend in self.backends if backend.name not in exclude]
+        if not candidates:
+            return None
+        now = time.monotonic()
+        healthy = [backend for backend in candidates if self._state[backend.name].cooldown_until <= now]
+        regular = [backend for backend in healthy if not backend.fallback_only]
+        if regular:
+            healthy = regular
+        elif healthy:
+            # Only fallbacks are left, taken in the configured order
+            return healthy[0]
+        if not healthy:
+            # Everything is cooling down: try whichever becomes available first
+            return min(candidates, key=lambda backend: self._state[backend.name].cooldown_until)
+        if len(healthy) > 1 and random.random() < self.explore_rate:
+            return random.choice(healthy)
+        return min(healthy, key=self.score)
+
+    def has_alternative(self, exclude) -> bool:
+        return any(backend.name not in exclude for backend in self.backends)
+
+    def record_success(self, backend, seconds: float):
+        state = self._state[backend.name]
+        state.calls += 1
+        state.latency = seconds if state.latency is None else state.latency + self.smoothing * (seconds - state.latency)
+        state.error_rate *= 1 - self.smoothing
+        state.consecutive_failures = 0
+
+    def record_failure(self, backend, throttled: bool = False):
+        state = self._state[backend.name]
+        state.calls += 1
+        state.failures += 1
+        state.error_rate += self.smoothing * (1 - state.error_rate)
+        state.consecutive_failures += 1
+        if throttled:
+            state.throttles += 1
+        if throttled or state.consecutive_failures >= self.failure_threshold:
+            state.cooldown_until = time.monotonic() + self.cooldown_seconds
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        backends = {}
+        for backend in self.backends:
+            state = self._state[backend.name]
+            backends[backend.name] = {
+                "model_id": backend.model_id,
+                "cost_per_image": backend.cost_per_image,
+                "max_samples": backend.max_samples,
+                "latency_seconds": state.latency,
+                "error_rate": state.error_rate,
+                "score": self.score(backend),
+                "cooling_down_seconds": max(0.0, state.cooldown_until - now),
+                "calls": state.calls,
+                "failures": state.failures,
+                "throttles": state.throttles,
+            }
+        return {"failovers": self.failovers, "backends": backends}
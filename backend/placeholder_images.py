@@ -0,0 +1,23 @@
+import random
+import struct
+import zlib
+
+
+def make_png(width: int, height: int, seed: int, noise: bool = False) -> bytes:
+    """Encode an RGB PNG derived from the seed.
+
+    Solid colour by default; with noise=True the pixels are random, so the PNG is
+    about as large as a real generated image of that size.
+    """
+    rng = random.Random(seed)
+    if noise:
+        raw = b"".join(b"\x00" + rng.randbytes(width * 3) for _ in range(height))
+    else:
+        pixel = bytes(rng.randrange(256) for _ in range(3))
+        raw = (b"\x00" + pixel * width) * height
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 1)) + chunk(b"IEND", b"")
@@ -0,0 +1,44 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+
+class ProcessPool:
+    """One process pool for all CPU-bound work: image variants, frame interpolation and WebP encoding.
+
+    The worker processes are started on first use, or earlier with warm_up(),
+    so creating the pool costs nothing at import time.
+    """
+
+    def __init__(self, processes: int = 2):
+        if processes < 1:
+            raise ValueError("processes must be at least 1")
+        self.processes = processes
+        self._executor = None
+        self.tasks = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.processes)
+        return self._executor
+
+    def submit(self, fn: Callable, *args) -> asyncio.Future:
+        """Run fn(*args) in a worker process and return an awaitable for its result"""
+        self.tasks += 1
+        return asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+
+    async def warm_up(self) -> dict:
+        """Start the worker processes now rather than on the first task"""
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(executor, os.getpid) for _ in range(self.processes)])
+        return {"processes": self.processes}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {"processes": self.processes, "started": self._executor is not None, "tasks": self.tasks}
@@ -0,0 +1,329 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Cost of one image relative to a full-quality 1024x1024 image at 50 steps
+REFERENCE_PIXELS = 1024 * 1024
+REFERENCE_STEPS = 50
+
+
+def image_cost(num_images: int, width: int, height: int, steps: int) -> float:
+    """Weight an image request by how much upstream work it needs: images x steps x pixels"""
+    return num_images * (steps / REFERENCE_STEPS) * (width * height / REFERENCE_PIXELS)
+
+
+class Limit:
+    """A token bucket: holds up to burst tokens of one resource and refills at per_second"""
+
+    __slots__ = ("name", "resource", "per_second", "burst")
+
+    def __init__(self, name: str, resource: str, per_second: float, burst: float):
+        if per_second <= 0 or burst <= 0:
+            raise ValueError(f"Rate limit {name} needs a positive rate and burst")
+        self.name = name
+        self.resource = resource
+        self.per_second = per_second
+        self.burst = burst
+
+    def refill(self, tokens: Optional[float], updated: float, now: float) -> float:
+        """Tokens in a bucket last seen holding tokens at updated; a bucket never seen is full"""
+        if tokens is None:
+            return self.burst
+        return min(self.burst, tokens + (now - updated) * self.per_second)
+
+
+def plan_take(limits: list, buckets: dict, costs: dict, now: float) -> tuple:
+    """Work out one take against several buckets, all or nothing.
+
+    buckets maps limit name -> (tokens, updated) as stored, or is missing the
+    limit if it has never been used. Returns (retry_after, new_tokens):
+    retry_after is 0 when every bucket has enough, otherwise the seconds until
+    they all will, and new_tokens maps limit name -> tokens to store.
+    """
+    retry_after = 0.0
+    new_tokens = {}
+    for limit in limits:
+        cost = costs.get(limit.resource, 0)
+        if not cost:
+            continue
+        tokens = limit.refill(*buckets.get(limit.name, (None, now)), now)
+        if tokens < cost:
+            retry_after = max(retry_after, (cost - tokens) / limit.per_second)
+        new_tokens[limit.name] = tokens - cost
+    return retry_after, new_tokens
+
+
+class RateLimitBackend:
+    """Interface for token bucket and usage storage.
+
+    ``take`` must check and consume all buckets of a request atomically, so
+    concurrent requests from one client cannot overspend.
+    """
+
+    async def take(self, client_id: str, limits: list, costs: dict) -> float:
+        """Consume costs from the client's buckets and return 0, or leave them as they are and return the seconds to wait"""
+        raise NotImplementedError
+
+    async def usage(self, limits: list, client_id: Optional[str] = None) -> dict:
+        """Return consumption, rejections and current tokens, per client and resource"""
+        raise NotImplementedError
+
+    async def cleanup(self, limits: list, usage_ttl: float) -> int:
+        """Drop buckets that have refilled completely, which behave like new ones, and usage not updated within usage_ttl"""
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Per-process buckets, so each uvicorn worker enforces the limits on its own"""
+
+    def __init__(self, max_clients: int = 100000):
+        self.max_clients = max_clients
+        # (client_id, limit name) -> (tokens, updated)
+        self._buckets = {}
+        # client_id -> resource -> {"consumed", "requests", "rejected"}, least recently seen first
+        self._usage = OrderedDict()
+        self._last_seen = {}
+
+    def _record(self, client_id: str, costs: dict, allowed: bool):
+        usage = self._usage.setdefault(client_id, {})
+        self._usage.move_to_end(client_id)
+        self._last_seen[client_id] = time.time()
+        for resource, cost in costs.items():
+            entry = usage.setdefault(resource, {"consumed": 0.0, "requests": 0, "rejected": 0})
+            if allowed:
+                entry["consumed"] += cost
+                entry["requests"] += 1
+            else:
+                entry["rejected"] += 1
+        while len(self._usage) > self.max_clients:
+            self._last_seen.pop(self._usage.popitem(last=False)[0], None)
+
+    async def take(self, client_id: str, limits: list, costs: dict) -> float:
+        now = time.time()
+        buckets = {
+            limit.name: self._buckets[(client_id, limit.name)]
+            for limit in limits if (client_id, limit.name) in self._buckets
+        }
+        retry_after, new_tokens = plan_take(limits, buckets, costs, now)
+        if not retry_after:
+            for name, tokens in new_tokens.items():
+                self._buckets[(client_id, name)] = (tokens, now)
+        self._record(client_id, costs, not retry_after)
+        return retry_after
+
+    async def usage(self, limits: list, client_id: Optional[str] = None) -> dict:
+        now = time.time()
+        clients = [client_id] if client_id is not None else list(self._usage)
+        return {
+            client: {
+                "usage": self._usage.get(client, {}),
+                "tokens": {
+                    limit.name: limit.refill(*self._buckets.get((client, limit.name), (None, now)), now)
+                    for limit in limits
+                }
+            }
+            for client in clients
+        }
+
+    async def cleanup(self, limits: list, usage_ttl: float) -> int:
+        now = time.time()
+        by_name = {limit.name: limit for limit in limits}
+        full = [
+            key for key, (tokens, updated) in self._buckets.items()
+            if key[1] not in by_name or by_name[key[1]].refill(tokens, updated, now) >= by_name[key[1]].burst
+        ]
+        for key in full:
+            del self._buckets[key]
+        # Usage is kept least recently seen first, so stale clients are at the front
+        while self._usage:
+            client_id = next(iter(self._usage))
+            if self._last_seen.get(client_id, 0) >= now - usage_ttl:
+                break
+            del self._usage[client_id]
+            self._last_seen.pop(client_id, None)
+        return len(full)
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """Buckets in a SQLite file, so every uvicorn worker on the host draws from the same budget"""
+
+    def __init__(self, path: str, max_clients: int = 100000):
+        self.path = path
+        self.max_clients = max_clients
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                " client_id TEXT NOT NULL,"
+                " name TEXT NOT NULL,"
+                " tokens REAL NOT NULL,"
+                " updated REAL NOT NULL,"
+                " PRIMARY KEY (client_id, name))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_usage ("
+                " client_id TEXT NOT NULL,"
+                " resource TEXT NOT NULL,"
+                " consumed REAL NOT NULL DEFAULT 0,"
+                " requests INTEGER NOT NULL DEFAULT 0,"
+                " rejected INTEGER NOT NULL DEFAULT 0,"
+                " last_seen REAL NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (client_id, resource))"
+            )
+
+    def _take(self, client_id: str, limits: list, costs: dict) -> float:
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two workers cannot spend the same tokens
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                buckets = {
+                    name: (tokens, updated) for name, tokens, updated in self._conn.execute(
+                        "SELECT name, tokens, updated FROM rate_limit_buckets WHERE client_id = ?", (client_id,)
+                    )
+                }
+                retry_after, new_tokens = plan_take(limits, buckets, costs, now)
+                if not retry_after:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO rate_limit_buckets (client_id, name, tokens, updated) VALUES (?, ?, ?, ?)",
+                        [(client_id, name, tokens, now) for name, tokens in new_tokens.items()]
+                    )
+                allowed = not retry_after
+                self._conn.executemany(
+                    "INSERT INTO rate_limit_usage (client_id, resource, consumed, requests, rejected, last_seen) VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (client_id, resource) DO UPDATE SET consumed = consumed + excluded.consumed,"
+                    " requests = requests + excluded.requests, rejected = rejected + excluded.rejected,"
+                    " last_seen = excluded.last_seen",
+                    [(client_id, resource, cost if allowed else 0, int(allowed), int(not allowed), now) for resource, cost in costs.items()]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return retry_after
+
+    def _usage(self, limits: list, client_id: Optional[str]) -> dict:
+        now = time.time()
+        where, params = (" WHERE client_id = ?", (client_id,)) if client_id is not None else ("", ())
+        with self._lock:
+            usage_rows = self._conn.execute(
+                "SELECT client_id, resource, consumed, requests, rejected FROM rate_limit_usage" + where, params
+            ).fetchall()
+            bucket_rows = self._conn.execute(
+                "SELECT client_id, name, tokens, updated FROM rate_limit_buckets" + where, params
+            ).fetchall()
+        buckets = {(client, name): (tokens, updated) for client, name, tokens, updated in bucket_rows}
+        clients = {}
+        for client, resource, consumed, requests, rejected in usage_rows:
+            clients.setdefault(client, {})[resource] = {"consumed": consumed, "requests": requests, "rejected": rejected}
+        if client_id is not None:
+            clients.setdefault(client_id, {})
+        return {
+            client: {
+                "usage": usage,
+                "tokens": {
+                    limit.name: limit.refill(*buckets.get((client, limit.name), (None, now)), now)
+                    for limit in limits
+                }
+            }
+            for client, usage in clients.items()
+        }
+
+    def _cleanup(self, limits: list, usage_ttl: float) -> int:
+        now = time.time()
+        by_name = {limit.name: limit for limit in limits}
+        with self._lock:
+            rows = self._conn.execute("SELECT client_id, name, tokens, updated FROM rate_limit_buckets").fetchall()
+            full = [
+                (client, name) for client, name, tokens, updated in rows
+                if name not in by_name or by_name[name].refill(tokens, updated, now) >= by_name[name].burst
+            ]
+            self._conn.executemany("DELETE FROM rate_limit_buckets WHERE client_id = ? AND name = ?", full)
+            self._conn.execute("DELETE FROM rate_limit_usage WHERE last_seen < ?", (now - usage_ttl,))
+            # Keep the most recently seen clients when there are more than max_clients
+            self._conn.execute(
+                "DELETE FROM rate_limit_usage WHERE client_id NOT IN ("
+                " SELECT client_id FROM rate_limit_usage GROUP BY client_id ORDER BY MAX(last_seen) DESC LIMIT ?)",
+                (self.max_clients,)
+            )
+        return len(full)
+
+    async def take(self, client_id: str, limits: list, costs: dict) -> float:
+        return await asyncio.to_thread(self._take, client_id, limits, costs)
+
+    async def usage(self, limits: list, client_id: Optional[str] = None) -> dict:
+        return await asyncio.to_thread(self._usage, limits, client_id)
+
+    async def cleanup(self, limits: list, usage_ttl: float) -> int:
+        return await asyncio.to_thread(self._cleanup, limits, usage_ttl)
+
+
+class RateLimiter:
+    """Per-client token buckets weighted by cost, checked before any work starts.
+
+    Each Limit meters one resource ("image_units" or "video_frames"). A
+    resource can have several limits, e.g. a per-minute rate with a small
+    burst and a daily quota as a bucket that refills over 24 hours. A request
+    is only let through when every bucket it draws from has enough tokens.
+    """
+
+    def __init__(self, backend: RateLimitBackend, limits: list, enabled: bool = True, usage_ttl: float = 7 * 86400):
+        self.backend = backend
+        self.limits = limits
+        self.enabled = enabled
+        self.usage_ttl = usage_ttl
+        self.allowed = 0
+        self.rejected = 0
+
+    def exceeds_burst(self, costs: dict) -> Optional[Limit]:
+        """Return a limit the request could never fit in, however long it waits"""
+        if not self.enabled:
+            return None
+        for limit in self.limits:
+            if costs.get(limit.resource, 0) > limit.burst:
+                return limit
+        return None
+
+    async def acquire(self, client_id: str, costs: dict) -> float:
+        """Charge costs to client_id and return 0, or return the seconds to wait before the request fits"""
+        if not self.enabled:
+            return 0.0
+        costs = {resource: cost for resource, cost in costs.items() if cost}
+        retry_after = await self.backend.take(client_id, self.limits, costs)
+        if retry_after:
+            self.rejected += 1
+        else:
+            self.allowed += 1
+        return retry_after
+
+    async def usage(self, client_id: Optional[str] = None) -> dict:
+        return {
+            "enabled": self.enabled,
+            "limits": {
+                limit.name: {"resource": limit.resource, "per_second": limit.per_second, "burst": limit.burst}
+                for limit in self.limits
+            },
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "clients": await self.backend.usage(self.limits, client_id),
+        }
+
+    async def cleanup(self) -> int:
+        return await self.backend.cleanup(self.limits, self.usage_ttl)
+
+
+def create_rate_limit_backend(backend: str, **options) -> RateLimitBackend:
+    """Build the backend selected by RATE_LIMIT_STORE ("memory" or "sqlite")"""
+    if backend == "memory":
+        return MemoryRateLimitBackend(options.get("max_clients", 100000))
+    if backend == "sqlite":
+        return SQLiteRateLimitBackend(options["path"], options.get("max_clients", 100000))
+    raise ValueError(f"Unknown rate limit store backend: {backend}")
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable
+
+from metrics import SCHEDULER_QUEUE_DEPTH, observe_stage
+
+# Priority classes, lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_VIDEO = 1
+# Offline bulk jobs only get slots nobody else is waiting for
+PRIORITY_BULK = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_VIDEO: "video",
+    PRIORITY_BULK: "bulk",
+}
+
+# Number of recent wait times kept for percentile reporting
+WAIT_SAMPLE_SIZE = 1000
+
+
+class _Job:
+    __slots__ = ("factory", "future", "enqueued_at")
+
+    def __init__(self, factory: Callable[[], Awaitable], future: asyncio.Future):
+        self.factory = factory
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class GenerationScheduler:
+    """Process-wide limiter for upstream generation calls.
+
+    Work is queued per priority class and, within a class, per client. Clients
+    are served round-robin so a single large request cannot starve everyone
+    else, and a higher priority class is always drained before a lower one.
+    """
+
+    def __init__(self, max_concurrency: int):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+
+        # priority -> client_id -> deque of pending jobs
+        self._queues = {priority: OrderedDict() for priority in PRIORITY_NAMES}
+        self._depth = {priority: 0 for priority in PRIORITY_NAMES}
+        self._running = set()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._wait_samples = {priority: deque(maxlen=WAIT_SAMPLE_SIZE) for priority in PRIORITY_NAMES}
+        self._max_wait = {priority: 0.0 for priority in PRIORITY_NAMES}
+
+    async def submit(self, client_id: str, priority: int, factory: Callable[[], Awaitable]):
+        """Queue factory() behind the concurrency limit and return its result"""
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority class: {priority}")
+
+        job = _Job(factory, asyncio.get_running_loop().create_future())
+        self._queues[priority].setdefault(client_id, deque()).append(job)
+        self._depth[priority] += 1
+        SCHEDULER_QUEUE_DEPTH.labels(PRIORITY_NAMES[priority]).inc()
+        self.submitted += 1
+        self._dispatch()
+        return await job.future
+
+    def _next_job(self):
+        for priority, clients in self._queues.items():
+            while clients:
+                client_id, jobs = next(iter(clients.items()))
+                job = jobs.popleft()
+                self._depth[priority] -= 1
+                SCHEDULER_QUEUE_DEPTH.labels(PRIORITY_NAMES[priority]).dec()
+                # Rotate the client to the back so the next pick goes to someone else
+                del clients[client_id]
+                if jobs:
+                    clients[client_id] = jobs
+                if job.future.cancelled():
+                    continue
+                return priority, job
+        return None
+
+    def _dispatch(self):
+        while self.in_flight < self.max_concurrency:
+            picked = self._next_job()
+            if picked is None:
+                return
+            priority, job = picked
+
+            waited = time.monotonic() - job.enqueued_at
+            self._wait_samples[priority].append(waited)
+            self._max_wait[priority] = max(self._max_wait[priority], waited)
+            observe_stage("queue_wait", waited)
+
+            self.in_flight += 1
+            task = asyncio.ensure_future(self._run(job))
+            # Keep a reference so the task is not garbage-collected mid-run
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            # A caller that gives up also stops the call, including any retries still to come
+            job.future.add_done_callback(lambda future, task=task: task.cancel() if future.cancelled() else None)
+
+    async def _run(self, job: _Job):
+        try:
+            result = await job.factory()
+        except Exception as e:
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self.completed += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self.in_flight -= 1
+            self._dispatch()
+
+    def stats(self) -> dict:
+        classes = {}
+        for priority, name in PRIORITY_NAMES.items():
+            samples = sorted(self._wait_samples[priority])
+            classes[name] = {
+                "queue_depth": self._depth[priority],
+                "queued_clients": len(self._queues[priority]),
+                "wait_p50_seconds": _percentile(samples, 0.50),
+                "wait_p95_seconds": _percentile(samples, 0.95),
+                "wait_p99_seconds": _percentile(samples, 0.99),
+                "wait_max_seconds": self._max_wait[priority],
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": sum(self._depth.values()),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "classes": classes,
+        }
+
+
+def _percentile(sorted_samples: list, fraction: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
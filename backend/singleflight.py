@@ -0,0 +1,69 @@
+import asyncio
+from typing import Awaitable, Callable
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into a single execution.
+
+    The first caller for a key starts factory() as its own task; callers that
+    arrive while it is still running await the same task instead of starting
+    another. The work is shielded, so one caller disconnecting does not cancel
+    it for the others, but it is cancelled once every caller has gone.
+
+    Calls are started at a priority (lower is more urgent, as in the
+    scheduler). A caller only joins a call started at its own priority or a
+    more urgent one, so urgent work never waits in a slower queue.
+    """
+
+    def __init__(self):
+        # key -> priority -> _Call
+        self._calls = {}
+        self.executions = 0
+        self.shared = 0
+        self.cancelled = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable], priority: int = 0):
+        calls = self._calls.setdefault(key, {})
+        joinable = [started for started in calls if started <= priority]
+        if joinable:
+            call = calls[min(joinable)]
+            self.shared += 1
+        else:
+            call = calls[priority] = _Call(asyncio.ensure_future(factory()))
+            self.executions += 1
+            call.task.add_done_callback(lambda done: self._finish(key, priority, call))
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            # Nobody is left to receive the result, so stop the work instead of paying for it
+            if not call.waiters and not call.task.done():
+                self.cancelled += 1
+                call.task.cancel()
+
+    def _finish(self, key: str, priority: int, call: _Call):
+        calls = self._calls.get(key, {})
+        if calls.get(priority) is call:
+            del calls[priority]
+            if not calls:
+                del self._calls[key]
+        # Mark the exception as retrieved in case every caller went away before it finished
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": sum(len(calls) for calls in self._calls.values()),
+            "executions": self.executions,
+            "shared": self.shared,
+            "cancelled": self.cancelled,
+        }
@@ -0,0 +1,183 @@
+"""Local stand-in for the bedrock-runtime InvokeModel API.
+
+Run it and point the backend at it:
+
+    python stub_bedrock.py --port 8100
+    BEDROCK_ENDPOINT_URL=http://127.0.0.1:8100 uvicorn main:app
+
+Latency, throttling and error rates can be tuned to mimic a loaded endpoint:
+
+    python stub_bedrock.py --latency 8 --latency-dist lognormal --latency-jitter 0.4 \\
+        --throttle-rate 0.05 --error-rate 0.01 --artifact-size 1024x1024
+
+SDXL, Titan Image and SD3 request bodies are answered in each model's response
+format. --unavailable-model makes one model ID fail, to exercise failover.
+"""
+import argparse
+import base64
+import json
+import math
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from placeholder_images import make_png
+
+INVOKE_PATH = re.compile(r"^/model/(?P<model_id>[^/]+)/invoke$")
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+def sample_latency(distribution: str, mean: float, jitter: float) -> float:
+    """Draw a latency in seconds; jitter is the relative spread around the mean"""
+    if mean <= 0:
+        return 0.0
+    if distribution == "uniform":
+        return random.uniform(mean * (1 - jitter), mean * (1 + jitter))
+    if distribution == "exponential":
+        return random.expovariate(1 / mean)
+    if distribution == "lognormal":
+        # Parameterised so the distribution's mean equals `mean`
+        sigma = max(jitter, 1e-6)
+        return random.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+    return mean
+
+
+class StubBedrockHandler(BaseHTTPRequestHandler):
+    # Set by serve()
+    latency = 0.0
+    latency_distribution = "fixed"
+    latency_jitter = 0.0
+    throttle_rate = 0.0
+    error_rate = 0.0
+    artifacts = None  # canned base64 artifacts, picked by seed
+    unavailable_models = ()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, error_type: str = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if error_type:
+            self.send_header("x-amzn-ErrorType", f"{error_type}:http://internal.amazon.com/coral/com.amazon.bedrock/")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        match = INVOKE_PATH.match(self.path)
+        if not match:
+            self._send_json(404, {"message": "Not found"}, "ResourceNotFoundException")
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if unquote(match.group("model_id")) in self.unavailable_models:
+            self._send_json(503, {"message": "The model is currently unavailable."}, "ServiceUnavailableException")
+            return
+        # Throttling is decided up front, like a real endpoint rejecting before doing any work
+        if random.random() < self.throttle_rate:
+            self._send_json(429, {"message": "Too many requests, please wait before trying again."}, "ThrottlingException")
+            return
+        delay = sample_latency(self.latency_distribution, self.latency, self.latency_jitter)
+        # Diffusion time grows with the step count; --latency is the time for 50 steps
+        delay *= int(body.get("steps", 50)) / 50
+        if delay:
+            time.sleep(delay)
+        if random.random() < self.error_rate:
+            self._send_json(500, {"message": "An internal server error occurred."}, "InternalServerException")
+            return
+
+        # Image-to-image requests are answered with their input image, the most coherent result possible
+        if "taskType" in body:
+            # Titan Image: numberOfImages images from a single seed
+            config = body.get("imageGenerationConfig", {})
+            seed = int(config.get("seed", 0))
+            init_image = (body.get("imageVariationParams") or {}).get("images", [None])[0]
+            images = [init_image or self._artifact(seed + i) for i in range(int(config.get("numberOfImages", 1)))]
+            self._send_json(200, {"images": images, "error": None})
+            return
+        if "mode" in body:
+            # SD3
+            seed = int(body.get("seed", 0))
+            self._send_json(200, {"seeds": [seed], "finish_reasons": [None], "images": [body.get("image") or self._artifact(seed)]})
+            return
+
+        # Like the Stability API, "samples" returns one artifact per consecutive seed
+        first_seed = int(body.get("seed", 0))
+        artifacts = [
+            {"seed": seed, "base64": body.get("init_image") or self._artifact(seed), "finishReason": "SUCCESS"}
+            for seed in range(first_seed, first_seed + int(body.get("samples", 1)))
+        ]
+        self._send_json(200, {"result": "success", "artifacts": artifacts})
+
+    def _artifact(self, seed: int) -> str:
+        if self.artifacts:
+            return self.artifacts[seed % len(self.artifacts)]
+        # Keep the stub cheap: encode a small image regardless of the requested size
+        return base64.b64encode(make_png(64, 64, seed)).decode("ascii")
+
+
+def load_artifacts(artifact_files: list = None, artifact_size: str = None, count: int = 8) -> list:
+    """Prepare canned base64 artifacts, from PNG files or generated noise images of the given WxH size"""
+    if artifact_files:
+        artifacts = []
+        for path in artifact_files:
+            with open(path, "rb") as f:
+                artifacts.append(base64.b64encode(f.read()).decode("ascii"))
+        return artifacts
+    if artifact_size:
+        width, height = (int(value) for value in artifact_size.lower().split("x"))
+        return [base64.b64encode(make_png(width, height, seed, noise=True)).decode("ascii") for seed in range(count)]
+    return None
+
+
+def serve(host: str, port: int, latency: float = 0.0, throttle_rate: float = 0.0, error_rate: float = 0.0,
+          latency_distribution: str = "fixed", latency_jitter: float = 0.0, artifacts: list = None,
+          unavailable_models: list = ()) -> ThreadingHTTPServer:
+    if latency_distribution not in LATENCY_DISTRIBUTIONS:
+        raise ValueError(f"Unknown latency distribution: {latency_distribution}")
+    handler = type("ConfiguredStubBedrockHandler", (StubBedrockHandler,), {
+        "latency": latency,
+        "latency_distribution": latency_distribution,
+        "latency_jitter": latency_jitter,
+        "throttle_rate": throttle_rate,
+        "error_rate": error_rate,
+        "artifacts": artifacts,
+        "unavailable_models": tuple(unavailable_models or ()),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for bedrock-runtime InvokeModel")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean seconds to wait before answering each call")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-jitter", type=float, default=0.25, help="Relative spread for uniform/lognormal latency")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of calls answered with ThrottlingException")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with InternalServerException")
+    parser.add_argument("--artifact", action="append", help="PNG file to return as the artifact (repeatable)")
+    parser.add_argument("--artifact-size", help="Return generated noise PNGs of this size, e.g. 1024x1024")
+    parser.add_argument("--unavailable-model", action="append", help="Model ID to answer with ServiceUnavailableException (repeatable)")
+    args = parser.parse_args()
+
+    server = serve(
+        args.host,
+        args.port,
+        latency=args.latency,
+        throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate,
+        latency_distribution=args.latency_dist,
+        latency_jitter=args.latency_jitter,
+        artifacts=load_artifacts(args.artifact, args.artifact_size),
+        unavailable_models=args.unavailable_model,
+    )
+    print(f"Stub bedrock-runtime listening on http://{args.host}:{args.port}", flush=True)
+    server.serve_forever()
@@ -1,6 +1,5 @@
 import requests
 import json
-import time
 import sys
 
 def test_api():
@@ -105,48 +104,55 @@ def test_api():
                     job_id = data["job_id"]
                     print(f"Job ID: {job_id}")
                     
-                    # Poll for status updates
-                    max_attempts = 10
-                    attempt = 0
+                    # Follow progress through the event stream instead of polling
+                    finished = False
+                    with requests.get(
+                        f"{url}/video-events/{job_id}",
+                        headers=headers,
+                        stream=True,
+                        timeout=300
+                    ) as events:
+                        for line in events.iter_lines(decode_unicode=True):
+                            if not line or not line.startswith("data: "):
+                                continue
+                            event = json.loads(line[len("data: "):])
+                            if event["event"] == "progress":
+                                print(f"Progress: {event['progress']}% ({event['frames_completed']}/{event['frames_total']} frames)")
+                            elif event["event"] in ("completed", "failed"):
+                                finished = True
+                                break
+                    
+                    if not finished:
+                        print("Event stream ended before video generation finished")
+                        continue
                     
-                    while attempt < max_attempts:
-                        time.sleep(2)  # Wait 2 seconds between polls
+                    status_response = requests.get(
+                        f"{url}/video-status/{job_id}",
+                        headers=headers
+                    )
+                    status_data = status_response.json()
+                    status = status_data.get("status")
+                    
+                    if status == "completed":
+                        video = status_data.get("video")
+                        if video:
+                            print(f"Video generation completed: {video['url']} ({video['content_type']}, {video['bytes']} bytes, {video['frames']} frames)")
+                            continue
+                        frames = status_data.get("frames", [])
+                        print(f"Video generation completed with {len(frames)} frames")
                         
-                        status_response = requests.get(
-                            f"{url}/video-status/{job_id}",
-                            headers=headers
-                        )
+                        for j, frame in enumerate(frames[:3]):  # Show details for first 3 frames
+                            base64_length = len(frame["base64"])
+                            width = frame.get("width", "unknown")
+                            height = frame.get("height", "unknown")
+                            style = frame.get("style_preset", "unknown")
+                            print(f"  Frame {j+1}: Base64 length: {base64_length}, Dimensions: {width}x{height}, Style: {style}")
                         
-                        if status_response.status_code == 200:
-                            status_data = status_response.json()
-                            status = status_data.get("status")
-                            progress = status_data.get("progress", 0)
-                            
-                            print(f"Status: {status}, Progress: {progress}%")
-                            
-                            if status == "completed":
-                                frames = status_data.get("frames", [])
-                                print(f"Video generation completed with {len(frames)} frames")
-                                
-                                for j, frame in enumerate(frames[:3]):  # Show details for first 3 frames
-                                    base64_length = len(frame["base64"])
-                                    width = frame.get("width", "unknown")
-                                    height = frame.get("height", "unknown")
-                                    style = frame.get("style_preset", "unknown")
-                                    print(f"  Frame {j+1}: Base64 length: {base64_length}, Dimensions: {width}x{height}, Style: {style}")
-                                
-                                if len(frames) > 3:
-                                    print(f"  ... and {len(frames) - 3} more frames")
-                                break
-                            elif status == "failed":
-                                error = status_data.get("error", "Unknown error")
-                                print(f"Video generation failed: {error}")
-                                break
-                        
-                        attempt += 1
-                    
-                    if attempt >= max_attempts:
-                        print("Timed out waiting for video generation to complete")
+                        if len(frames) > 3:
+                            print(f"  ... and {len(frames) - 3} more frames")
+                    elif status == "failed":
+                        error = status_data.get("error", "Unknown error")
+                        print(f"Video generation failed: {error}")
                 else:
                     print("Unexpected response format: 'job_id' key not found")
             else:
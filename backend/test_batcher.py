@@ -0,0 +1,115 @@
+import asyncio
+
+from batcher import MicroBatcher
+
+LINGER_SECONDS = 0.05
+
+
+class Runner:
+    """A batch call that records the items of each batch and answers with item * 10"""
+
+    def __init__(self, release: asyncio.Event = None):
+        self.batches = []
+        self.release = release
+        self.cancelled = 0
+
+    async def __call__(self, items: list) -> dict:
+        self.batches.append(list(items))
+        if self.release is not None:
+            try:
+                await self.release.wait()
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+        return {item: item * 10 for item in items}
+
+
+def test_items_within_the_linger_time_share_a_batch():
+    batcher = MicroBatcher(max_batch_size=4, linger_seconds=LINGER_SECONDS)
+    runner = Runner()
+
+    async def main():
+        return await asyncio.gather(*[batcher.submit("prompt", item, runner) for item in (1, 2, 3)])
+
+    assert asyncio.run(main()) == [10, 20, 30]
+    assert runner.batches == [[1, 2, 3]]
+
+
+def test_full_batch_runs_without_waiting():
+    batcher = MicroBatcher(max_batch_size=2, linger_seconds=60)
+    runner = Runner()
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(*[batcher.submit("prompt", item, runner) for item in (1, 2, 3, 4)]), 1)
+
+    assert asyncio.run(main()) == [10, 20, 30, 40]
+    assert runner.batches == [[1, 2], [3, 4]]
+    assert batcher.stats()["full_batches"] == 2
+
+
+def test_cancelled_item_leaves_a_batch_that_has_not_started():
+    batcher = MicroBatcher(max_batch_size=4, linger_seconds=LINGER_SECONDS)
+    runner = Runner()
+
+    async def main():
+        first = asyncio.create_task(batcher.submit("prompt", 1, runner))
+        second = asyncio.create_task(batcher.submit("prompt", 2, runner))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == 20
+    assert runner.batches == [[2]]
+
+
+def test_batch_is_closed_when_every_item_leaves_before_it_starts():
+    batcher = MicroBatcher(max_batch_size=4, linger_seconds=LINGER_SECONDS)
+    runner = Runner()
+
+    async def main():
+        items = [asyncio.create_task(batcher.submit("prompt", item, runner)) for item in (1, 2)]
+        await asyncio.sleep(0)
+        for item in items:
+            item.cancel()
+        await asyncio.gather(*items, return_exceptions=True)
+        await asyncio.sleep(LINGER_SECONDS * 2)
+
+    asyncio.run(main())
+    assert runner.batches == []
+    assert batcher.stats()["open_batches"] == 0
+
+
+def test_running_batch_is_cancelled_once_no_item_is_awaited():
+    batcher = MicroBatcher(max_batch_size=2, linger_seconds=LINGER_SECONDS)
+
+    async def main():
+        runner = Runner(asyncio.Event())
+        items = [asyncio.create_task(batcher.submit("prompt", item, runner)) for item in (1, 2)]
+        await asyncio.sleep(0.01)
+        items[0].cancel()
+        await asyncio.sleep(0.01)
+        # One item is still waiting for the result, so the batch keeps running
+        assert runner.cancelled == 0
+        items[1].cancel()
+        await asyncio.gather(*items, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        # Checked before asyncio.run() cancels whatever is left on the way out
+        assert runner.cancelled == 1
+        return runner
+
+    runner = asyncio.run(main())
+    assert runner.batches == [[1, 2]]
+
+
+def test_per_item_errors_stay_with_their_item():
+    batcher = MicroBatcher(max_batch_size=2, linger_seconds=LINGER_SECONDS)
+
+    async def run(items):
+        return {1: "ok", 2: ValueError("filtered")}
+
+    async def main():
+        return await asyncio.gather(batcher.submit("prompt", 1, run), batcher.submit("prompt", 2, run), return_exceptions=True)
+
+    ok, error = asyncio.run(main())
+    assert ok == "ok"
+    assert isinstance(error, ValueError)
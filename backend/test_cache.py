@@ -0,0 +1,133 @@
+import os
+import time
+
+from cache import STALE_TMP_SECONDS, ImageCache, cache_key
+
+TTL_SECONDS = 3600
+
+
+def make_cache(tmp_path, **options) -> ImageCache:
+    settings = {"max_memory_bytes": 1000, "ttl_seconds": TTL_SECONDS, **options}
+    return ImageCache(str(tmp_path / "cache"), **settings)
+
+
+def key(name: str) -> str:
+    return cache_key("model", {"prompt": name})
+
+
+def age(cache: ImageCache, name: str, seconds: float):
+    """Make the disk entry for name look as if it was stored that many seconds ago"""
+    stored_at = time.time() - seconds
+    os.utime(cache._path(key(name)), (stored_at, stored_at))
+
+
+def test_cache_key_ignores_field_order():
+    assert cache_key("model", {"a": 1, "b": 2}) == cache_key("model", {"b": 2, "a": 1})
+    assert cache_key("model", {"a": 1}) != cache_key("other", {"a": 1})
+
+
+def test_hits_come_from_memory_then_from_disk(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put(key("cat"), b"png")
+    assert cache.get(key("cat")) == b"png"
+    assert cache.get(key("dog")) is None
+    assert (cache.memory_hits, cache.disk_hits, cache.misses) == (1, 0, 1)
+
+    # A new process starts with an empty memory tier and reads the file
+    restarted = make_cache(tmp_path)
+    assert restarted.get(key("cat")) == b"png"
+    assert restarted.get(key("cat")) == b"png"
+    assert (restarted.memory_hits, restarted.disk_hits) == (1, 1)
+
+
+def test_memory_tier_is_an_lru_bounded_by_bytes(tmp_path):
+    cache = make_cache(tmp_path, max_memory_bytes=250)
+    cache.put(key("a"), b"a" * 100)
+    cache.put(key("b"), b"b" * 100)
+    cache.get(key("a"))
+    cache.put(key("c"), b"c" * 100)
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["memory_entries"] == 2
+    assert stats["memory_bytes"] == 200
+    # The least recently used entry left memory but is still on disk
+    assert cache.get(key("b")) == b"b" * 100
+    assert cache.disk_hits == 1
+
+
+def test_entries_larger_than_the_memory_tier_stay_on_disk(tmp_path):
+    cache = make_cache(tmp_path, max_memory_bytes=50)
+    cache.put(key("big"), b"x" * 100)
+    assert cache.stats()["memory_entries"] == 0
+    assert cache.get(key("big")) == b"x" * 100
+    assert cache.disk_hits == 1
+
+
+def test_expired_disk_entries_are_misses_and_removed(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put(key("old"), b"png")
+    age(cache, "old", TTL_SECONDS + 1)
+
+    restarted = make_cache(tmp_path)
+    assert restarted.get(key("old")) is None
+    assert restarted.expirations == 1
+    assert not os.path.exists(restarted._path(key("old")))
+
+
+def test_expired_memory_entries_are_misses(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=2)
+    cache.put(key("old"), b"png")
+    age(cache, "old", 1.9)
+
+    # Loaded from disk, the entry keeps the time it was stored at and expires in memory as well
+    restarted = make_cache(tmp_path, ttl_seconds=2)
+    assert restarted.get(key("old")) == b"png"
+    time.sleep(0.2)
+    assert restarted.get(key("old")) is None
+    assert restarted.stats()["memory_entries"] == 0
+    assert restarted.expirations == 2
+
+
+def test_cleanup_trims_the_disk_tier_oldest_first(tmp_path):
+    cache = make_cache(tmp_path, max_disk_bytes=250)
+    for index, name in enumerate(["first", "second", "third", "fourth"]):
+        cache.put(key(name), b"x" * 100)
+        age(cache, name, 100 - index)
+
+    assert cache.cleanup() == 2
+    assert cache.disk_bytes == 200
+    assert cache.evictions == 2
+    remaining = [name for name in ["first", "second", "third", "fourth"] if os.path.exists(cache._path(key(name)))]
+    assert remaining == ["third", "fourth"]
+
+
+def test_cleanup_removes_expired_entries_and_stale_temporary_files(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put(key("old"), b"png")
+    cache.put(key("new"), b"png")
+    age(cache, "old", TTL_SECONDS + 1)
+    stale_tmp = cache._path(key("crashed")) + ".123.456.tmp"
+    fresh_tmp = cache._path(key("writing")) + ".123.789.tmp"
+    for path in (stale_tmp, fresh_tmp):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"partial")
+    old = time.time() - STALE_TMP_SECONDS - 1
+    os.utime(stale_tmp, (old, old))
+
+    assert cache.cleanup() == 1
+    assert cache.expirations == 1
+    assert not os.path.exists(cache._path(key("old")))
+    assert os.path.exists(cache._path(key("new")))
+    assert not os.path.exists(stale_tmp)
+    # A write still in progress is left alone
+    assert os.path.exists(fresh_tmp)
+    assert cache.disk_bytes == 3
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = make_cache(tmp_path, enabled=False)
+    cache.put(key("cat"), b"png")
+    assert cache.get(key("cat")) is None
+    assert not os.path.exists(cache._path(key("cat")))
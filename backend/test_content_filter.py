@@ -0,0 +1,57 @@
+from content_filter import ContentFilter, FilterEngine, normalize
+
+ENTRIES = [
+    ("violence", "violence", "high"),
+    ("gore", "violence", "medium"),
+    ("nsfw", "adult", "low"),
+]
+
+
+def spans(prompt: str) -> list:
+    return [(match.term, prompt[match.start:match.end], match.word) for match in FilterEngine(ENTRIES).scan(prompt)]
+
+
+def test_plain_match_and_span():
+    assert spans("a scene of violence at dawn") == [("violence", "violence", "violence")]
+
+
+def test_no_match_on_clean_prompt():
+    assert spans("a quiet lake at sunrise") == []
+
+
+def test_leetspeak_is_folded():
+    assert spans("so much v10l3nc3!") == [("violence", "v10l3nc3", "v10l3nc3!")]
+    assert spans("G0R3 everywhere") == [("gore", "G0R3", "G0R3")]
+
+
+def test_accents_are_dropped_and_spans_point_into_the_original():
+    assert spans("pure víolénce here") == [("violence", "víolénce", "víolénce")]
+    # A decomposed accent is its own character in the prompt, and stays inside the span
+    prompt = "vio\u0301lence"
+    assert spans(prompt) == [("violence", prompt, prompt)]
+
+
+def test_compatibility_characters_are_folded():
+    prompt = "ｖｉｏｌｅｎｃｅ and more"
+    assert spans(prompt) == [("violence", "ｖｉｏｌｅｎｃｅ", "ｖｉｏｌｅｎｃｅ")]
+
+
+def test_terms_inside_words_and_overlapping_terms():
+    engine = FilterEngine([("he", "x", "low"), ("she", "x", "low"), ("hers", "x", "low")])
+    prompt = "ushers"
+    found = sorted((match.term, match.start, match.end) for match in engine.scan(prompt))
+    assert found == [("he", 2, 4), ("hers", 2, 6), ("she", 1, 4)]
+
+
+def test_normalize_maps_every_folded_character_to_its_source():
+    folded, positions = normalize("Straße")
+    assert folded == "strasse"
+    assert list(positions) == [0, 1, 2, 3, 4, 4, 5]
+
+
+def test_blocked_respects_severity(tmp_path):
+    wordlist = tmp_path / "words.txt"
+    wordlist.write_text("# term,category,severity\nviolence,violence,high\nnsfw,adult,low\n", encoding="utf-8")
+    content_filter = ContentFilter(str(wordlist), block_severity="medium")
+    assert content_filter.blocked("nsfw art") == []
+    assert [match.term for match in content_filter.blocked("nsfw v1olence")] == ["violence"]
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+
+from job_store import MemoryJobStore, SQLiteJobStore
+
+LEASE_SECONDS = 0.2
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryJobStore()
+    return SQLiteJobStore(str(tmp_path / "jobs.db"))
+
+
+def queue_job(store, job_id: str, status: str = "queued"):
+    asyncio.run(store.create(job_id, {"status": status, "request": {"prompt": job_id}}))
+    # Claims go oldest first, so keep creation times apart
+    time.sleep(0.01)
+
+
+def test_claim_returns_the_oldest_runnable_job(store):
+    queue_job(store, "done", status="completed")
+    queue_job(store, "first")
+    queue_job(store, "second")
+    asyncio.run(store.create("no-request", {"status": "queued"}))
+
+    job = asyncio.run(store.claim("worker-a", LEASE_SECONDS))
+    assert job["id"] == "first"
+    assert job["attempts"] == 1
+    assert asyncio.run(store.claim("worker-b", LEASE_SECONDS))["id"] == "second"
+    assert asyncio.run(store.claim("worker-c", LEASE_SECONDS)) is None
+
+
+def test_renew_only_for_the_lease_owner(store):
+    queue_job(store, "job")
+    asyncio.run(store.claim("worker-a", LEASE_SECONDS))
+
+    assert asyncio.run(store.renew("job", "worker-a", LEASE_SECONDS))
+    assert not asyncio.run(store.renew("job", "worker-b", LEASE_SECONDS))
+    assert not asyncio.run(store.renew("missing", "worker-a", LEASE_SECONDS))
+
+
+def test_renew_keeps_the_job_from_being_claimed(store):
+    queue_job(store, "job")
+    asyncio.run(store.claim("worker-a", LEASE_SECONDS))
+    for _ in range(3):
+        time.sleep(LEASE_SECONDS / 2)
+        assert asyncio.run(store.renew("job", "worker-a", LEASE_SECONDS))
+    assert asyncio.run(store.claim("worker-b", LEASE_SECONDS)) is None
+
+
+def test_expired_lease_is_claimed_again(store):
+    queue_job(store, "job")
+    asyncio.run(store.claim("worker-a", LEASE_SECONDS))
+    asyncio.run(store.update("job", status="processing"))
+    time.sleep(LEASE_SECONDS * 1.5)
+
+    job = asyncio.run(store.claim("worker-b", LEASE_SECONDS))
+    assert job["id"] == "job"
+    assert job["attempts"] == 2
+    # The first worker has been taken over and must stop
+    assert not asyncio.run(store.renew("job", "worker-a", LEASE_SECONDS))
+    assert asyncio.run(store.renew("job", "worker-b", LEASE_SECONDS))
+
+
+def test_renew_fails_once_the_job_is_finished_or_deleted(store):
+    queue_job(store, "finished")
+    queue_job(store, "deleted")
+    asyncio.run(store.claim("worker-a", LEASE_SECONDS))
+    asyncio.run(store.claim("worker-a", LEASE_SECONDS))
+
+    asyncio.run(store.update("finished", status="completed"))
+    asyncio.run(store.delete("deleted"))
+    assert not asyncio.run(store.renew("finished", "worker-a", LEASE_SECONDS))
+    assert not asyncio.run(store.renew("deleted", "worker-a", LEASE_SECONDS))
+
+
+def test_release_lets_another_worker_claim(store):
+    queue_job(store, "job")
+    asyncio.run(store.claim("worker-a", LEASE_SECONDS))
+    # Only the owner can release the lease
+    asyncio.run(store.release("job", "worker-b"))
+    assert asyncio.run(store.claim("worker-b", LEASE_SECONDS)) is None
+
+    asyncio.run(store.release("job", "worker-a"))
+    assert asyncio.run(store.claim("worker-b", LEASE_SECONDS))["id"] == "job"
+
+
+def test_transition_only_from_the_given_statuses(store):
+    queue_job(store, "job")
+    assert asyncio.run(store.transition("job", ("queued", "processing"), status="processing", progress=10))
+    asyncio.run(store.update("job", status="cancelled"))
+
+    # A worker finishing after the job was cancelled must not overwrite the cancellation
+    assert not asyncio.run(store.transition("job", ("processing",), status="completed"))
+    job = asyncio.run(store.get("job"))
+    assert job["status"] == "cancelled"
+    assert job["progress"] == 10
+    assert not asyncio.run(store.transition("missing", ("queued",), status="cancelled"))
+
+
+def test_cancelled_job_is_not_renewed_or_claimed(store):
+    queue_job(store, "job")
+    asyncio.run(store.claim("worker-a", LEASE_SECONDS))
+    assert asyncio.run(store.transition("job", ("queued", "processing"), status="cancelled"))
+    assert not asyncio.run(store.transition("job", ("queued", "processing"), status="processing"))
+
+    assert not asyncio.run(store.renew("job", "worker-a", LEASE_SECONDS))
+    asyncio.run(store.release("job", "worker-a"))
+    assert asyncio.run(store.claim("worker-b", LEASE_SECONDS)) is None
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from rate_limit import Limit, MemoryRateLimitBackend, RateLimiter, SQLiteRateLimitBackend, image_cost, plan_take
+
+MINUTE = Limit("images_per_minute", "image_units", per_second=1.0, burst=10.0)
+DAY = Limit("images_per_day", "image_units", per_second=0.01, burst=20.0)
+FRAMES = Limit("frames_per_minute", "video_frames", per_second=2.0, burst=30.0)
+LIMITS = [MINUTE, DAY, FRAMES]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryRateLimitBackend()
+    return SQLiteRateLimitBackend(str(tmp_path / "rate_limits.db"))
+
+
+def test_image_cost_is_relative_to_a_full_quality_image():
+    assert image_cost(1, 1024, 1024, 50) == 1.0
+    assert image_cost(4, 512, 512, 25) == 0.5
+
+
+def test_plan_take_from_new_buckets():
+    retry_after, new_tokens = plan_take(LIMITS, {}, {"image_units": 4}, now=100.0)
+    assert retry_after == 0
+    # Only the buckets of the requested resource are touched
+    assert new_tokens == {"images_per_minute": 6.0, "images_per_day": 16.0}
+
+
+def test_plan_take_refills_since_last_update():
+    buckets = {"images_per_minute": (2.0, 95.0), "images_per_day": (5.0, 95.0)}
+    retry_after, new_tokens = plan_take(LIMITS, buckets, {"image_units": 3}, now=100.0)
+    assert retry_after == 0
+    assert new_tokens["images_per_minute"] == pytest.approx(4.0)
+    assert new_tokens["images_per_day"] == pytest.approx(2.05)
+
+
+def test_plan_take_waits_for_the_slowest_bucket():
+    # The minute bucket is one token short, the daily quota two
+    buckets = {"images_per_minute": (2.0, 100.0), "images_per_day": (1.0, 100.0)}
+    retry_after, _ = plan_take(LIMITS, buckets, {"image_units": 3}, now=100.0)
+    assert retry_after == pytest.approx(200.0)
+
+
+def test_take_is_all_or_nothing_across_buckets(backend):
+    # Drain the daily quota to 2 tokens while the minute bucket refills
+    assert asyncio.run(backend.take("alice", [DAY], {"image_units": 18})) == 0
+    before = asyncio.run(backend.usage(LIMITS, "alice"))["alice"]["tokens"]
+
+    # The minute bucket could afford 5 units, the daily quota cannot, so neither is charged
+    retry_after = asyncio.run(backend.take("alice", LIMITS, {"image_units": 5, "video_frames": 10}))
+    assert retry_after > 0
+    after = asyncio.run(backend.usage(LIMITS, "alice"))["alice"]
+    assert after["tokens"]["images_per_minute"] == pytest.approx(before["images_per_minute"])
+    assert after["tokens"]["images_per_day"] == pytest.approx(before["images_per_day"], abs=0.01)
+    assert after["tokens"]["frames_per_minute"] == pytest.approx(FRAMES.burst)
+    assert after["usage"]["image_units"]["rejected"] == 1
+
+    # A request that fits is charged to every bucket it draws from
+    assert asyncio.run(backend.take("alice", LIMITS, {"image_units": 1, "video_frames": 10})) == 0
+    tokens = asyncio.run(backend.usage(LIMITS, "alice"))["alice"]["tokens"]
+    assert tokens["images_per_day"] == pytest.approx(before["images_per_day"] - 1, abs=0.01)
+    assert tokens["frames_per_minute"] == pytest.approx(FRAMES.burst - 10, abs=0.1)
+
+
+def test_clients_have_separate_buckets(backend):
+    assert asyncio.run(backend.take("alice", [MINUTE], {"image_units": 10})) == 0
+    assert asyncio.run(backend.take("alice", [MINUTE], {"image_units": 5})) > 0
+    assert asyncio.run(backend.take("bob", [MINUTE], {"image_units": 5})) == 0
+
+
+def test_cleanup_drops_stale_usage(backend):
+    asyncio.run(backend.take("alice", [MINUTE], {"image_units": 1}))
+    asyncio.run(backend.cleanup([MINUTE], usage_ttl=3600))
+    assert "alice" in asyncio.run(backend.usage([MINUTE]))
+
+    asyncio.run(backend.cleanup([MINUTE], usage_ttl=-1))
+    assert "alice" not in asyncio.run(backend.usage([MINUTE]))
+
+
+def test_requests_larger_than_a_burst_never_fit():
+    limiter = RateLimiter(MemoryRateLimitBackend(), LIMITS)
+    assert limiter.exceeds_burst({"image_units": 11}) is MINUTE
+    assert limiter.exceeds_burst({"image_units": 10, "video_frames": 30}) is None
+    assert RateLimiter(MemoryRateLimitBackend(), LIMITS, enabled=False).exceeds_burst({"image_units": 11}) is None
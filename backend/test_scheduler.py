@@ -0,0 +1,87 @@
+import asyncio
+
+from scheduler import GenerationScheduler, PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_VIDEO
+
+
+async def run_queued(scheduler: GenerationScheduler, submissions: list) -> list:
+    """Queue (client_id, priority, name) jobs behind a busy slot and return the names in the order they ran"""
+    order = []
+    release = asyncio.Event()
+
+    async def blocker():
+        await release.wait()
+
+    def job(name):
+        async def factory():
+            order.append(name)
+            return name
+        return factory
+
+    blocking = asyncio.create_task(scheduler.submit("blocker", PRIORITY_INTERACTIVE, blocker))
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(scheduler.submit(client_id, priority, job(name))) for client_id, priority, name in submissions]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(blocking, *tasks)
+    return order
+
+
+def test_clients_are_served_round_robin():
+    scheduler = GenerationScheduler(max_concurrency=1)
+    order = asyncio.run(run_queued(scheduler, [
+        ("alice", PRIORITY_INTERACTIVE, "a1"),
+        ("alice", PRIORITY_INTERACTIVE, "a2"),
+        ("alice", PRIORITY_INTERACTIVE, "a3"),
+        ("bob", PRIORITY_INTERACTIVE, "b1"),
+        ("bob", PRIORITY_INTERACTIVE, "b2"),
+    ]))
+    assert order == ["a1", "b1", "a2", "b2", "a3"]
+
+
+def test_higher_priority_classes_run_first():
+    scheduler = GenerationScheduler(max_concurrency=1)
+    order = asyncio.run(run_queued(scheduler, [
+        ("alice", PRIORITY_BULK, "bulk"),
+        ("alice", PRIORITY_VIDEO, "video"),
+        ("bob", PRIORITY_INTERACTIVE, "interactive"),
+    ]))
+    assert order == ["interactive", "video", "bulk"]
+
+
+def test_concurrency_limit_is_respected():
+    scheduler = GenerationScheduler(max_concurrency=2)
+    peak = 0
+
+    async def factory():
+        nonlocal peak
+        peak = max(peak, scheduler.in_flight)
+        await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*[scheduler.submit(f"client-{i}", PRIORITY_INTERACTIVE, factory) for i in range(6)])
+
+    asyncio.run(main())
+    assert peak == 2
+    assert scheduler.stats()["completed"] == 6
+
+
+def test_cancelled_caller_stops_the_running_call():
+    scheduler = GenerationScheduler(max_concurrency=1)
+    stopped = []
+
+    async def factory():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            stopped.append(True)
+            raise
+
+    async def main():
+        caller = asyncio.create_task(scheduler.submit("alice", PRIORITY_INTERACTIVE, factory))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert stopped == [True]
+    assert scheduler.in_flight == 0
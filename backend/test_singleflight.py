@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_VIDEO
+from singleflight import SingleFlight
+
+
+class Work:
+    """A factory whose calls block until released, recording how each one ended"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.started = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return "image"
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+
+    async def main():
+        work = Work()
+        callers = [asyncio.create_task(flight.do("key", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        work.release.set()
+        return work, await asyncio.gather(*callers)
+
+    work, results = asyncio.run(main())
+    assert results == ["image"] * 3
+    assert work.started == 1
+    assert flight.stats() == {"in_flight": 0, "executions": 1, "shared": 2, "cancelled": 0}
+
+
+def test_joined_caller_leaving_does_not_cancel_the_call():
+    flight = SingleFlight()
+
+    async def main():
+        work = Work()
+        first = asyncio.create_task(flight.do("key", work))
+        joined = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        joined.cancel()
+        await asyncio.sleep(0)
+        work.release.set()
+        return work, await first, joined
+
+    work, result, joined = asyncio.run(main())
+    assert result == "image"
+    assert joined.cancelled()
+    assert work.cancelled == 0
+    assert flight.stats()["cancelled"] == 0
+
+
+def test_last_caller_leaving_cancels_the_call():
+    flight = SingleFlight()
+
+    async def main():
+        work = Work()
+        callers = [asyncio.create_task(flight.do("key", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        # Checked before asyncio.run() cancels whatever is left on the way out
+        assert work.cancelled == 1
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+    assert flight.stats()["cancelled"] == 1
+
+
+def test_lower_priority_callers_join_more_urgent_calls():
+    flight = SingleFlight()
+
+    async def main():
+        work = Work()
+        interactive = asyncio.create_task(flight.do("key", work, PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        bulk = asyncio.create_task(flight.do("key", work, PRIORITY_BULK))
+        await asyncio.sleep(0)
+        work.release.set()
+        return work, await asyncio.gather(interactive, bulk)
+
+    work, results = asyncio.run(main())
+    assert results == ["image", "image"]
+    assert work.started == 1
+    assert flight.stats()["shared"] == 1
+
+
+def test_more_urgent_callers_do_not_wait_behind_lower_priority_calls():
+    flight = SingleFlight()
+
+    async def main():
+        bulk_work, interactive_work = Work(), Work()
+        bulk = asyncio.create_task(flight.do("key", bulk_work, PRIORITY_BULK))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(flight.do("key", interactive_work, PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        # A video caller joins the interactive call, the most urgent one it may share
+        video = asyncio.create_task(flight.do("key", bulk_work, PRIORITY_VIDEO))
+        await asyncio.sleep(0)
+        assert flight.stats()["in_flight"] == 2
+
+        interactive_work.release.set()
+        assert await interactive == "image"
+        assert await video == "image"
+        assert not bulk.done()
+        bulk_work.release.set()
+        await bulk
+        return bulk_work, interactive_work
+
+    bulk_work, interactive_work = asyncio.run(main())
+    assert bulk_work.started == 1
+    assert interactive_work.started == 1
+    assert flight.stats()["executions"] == 2
+
+
+def test_errors_reach_every_caller_and_are_not_shared_afterwards():
+    flight = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0)
+        raise RuntimeError("throttled")
+
+    async def main():
+        results = await asyncio.gather(flight.do("key", failing), flight.do("key", failing), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await flight.do("key", failing)
+        return results
+
+    results = asyncio.run(main())
+    assert [str(result) for result in results] == ["throttled", "throttled"]
+    assert len(calls) == 2
@@ -0,0 +1,155 @@
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+from process_pool import ProcessPool
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional, only needed for the animated WebP fallback
+    Image = None
+
+# ffmpeg arguments per container, reading PNG frames from stdin
+FFMPEG_OUTPUT_ARGS = {
+    "mp4": ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p", "-movflags", "+faststart", "-f", "mp4"],
+    "webm": ["-c:v", "libvpx-vp9", "-b:v", "0", "-crf", "33", "-row-mt", "1", "-f", "webm"],
+}
+
+def encode_animated_webp(frame_paths: list, fps: int, quality: int) -> bytes:
+    """Encode a list of PNG files as an animated WebP (runs in a worker process)"""
+    images = []
+    for path in frame_paths:
+        with Image.open(path) as image:
+            images.append(image.convert("RGB"))
+    output = io.BytesIO()
+    images[0].save(
+        output,
+        format="WEBP",
+        save_all=True,
+        append_images=images[1:],
+        duration=int(1000 / fps),
+        loop=0,
+        quality=quality,
+    )
+    return output.getvalue()
+
+
+def available_encoder(video_format: str, ffmpeg_binary: str) -> Optional[str]:
+    """Return "ffmpeg" or "webp" depending on what can produce the requested container, or None"""
+    if video_format in FFMPEG_OUTPUT_ARGS and shutil.which(ffmpeg_binary):
+        return "ffmpeg"
+    if Image is not None:
+        Image.init()
+        if "WEBP" in Image.SAVE:
+            return "webp"
+    return None
+
+
+class VideoEncoder:
+    """Assemble frames into a single video as they arrive.
+
+    Frames are passed as paths to PNG files and may be added out of order; they
+    are written in index order and missing (failed) frames are skipped. With ffmpeg the frames are streamed into a
+    separate encoder process, otherwise an animated WebP is built in the given
+    process pool once all frames are in.
+    """
+
+    def __init__(self, num_frames: int, fps: int, pool: ProcessPool, video_format: str = "mp4", ffmpeg_binary: str = "ffmpeg", webp_quality: int = 80):
+        self.num_frames = num_frames
+        self.fps = fps
+        self.pool = pool
+        self.ffmpeg_binary = ffmpeg_binary
+        self.webp_quality = webp_quality
+        self.encoder = available_encoder(video_format, ffmpeg_binary)
+        if self.encoder is None:
+            raise RuntimeError("No video encoder available. Install ffmpeg or Pillow with WebP support.")
+        self.format = video_format if self.encoder == "ffmpeg" else "webp"
+
+        self.frames_written = 0
+        self._next_index = 0
+        # index -> PNG path, or None for a frame that failed
+        self._pending = {}
+        self._buffered = []
+        self._process = None
+        self._output_path = None
+        # Frames are reported concurrently; writes must stay in index order
+        self._lock = asyncio.Lock()
+
+    @property
+    def content_type(self) -> str:
+        return {"mp4": "video/mp4", "webm": "video/webm", "webp": "image/webp"}[self.format]
+
+    async def _start_ffmpeg(self):
+        fd, self._output_path = tempfile.mkstemp(suffix=f".{self.format}")
+        os.close(fd)
+        self._process = await asyncio.create_subprocess_exec(
+            self.ffmpeg_binary, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "image2pipe", "-framerate", str(self.fps), "-i", "-",
+            *FFMPEG_OUTPUT_ARGS[self.format], self._output_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+    async def _write(self, frame_path: str):
+        if self.encoder == "ffmpeg":
+            if self._process is None:
+                await self._start_ffmpeg()
+            self._process.stdin.write(await asyncio.to_thread(_read_file, frame_path))
+            await self._process.stdin.drain()
+        else:
+            self._buffered.append(frame_path)
+        self.frames_written += 1
+
+    async def add_frame(self, index: int, frame_path: Optional[str]):
+        """Hand over frame index, or None if that frame could not be generated"""
+        async with self._lock:
+            self._pending[index] = frame_path
+            await self._flush()
+
+    async def _flush(self):
+        while self._next_index in self._pending:
+            ready = self._pending.pop(self._next_index)
+            self._next_index += 1
+            if ready is not None:
+                await self._write(ready)
+
+    async def finish(self) -> bytes:
+        """Flush remaining frames and return the encoded video"""
+        async with self._lock:
+            for index in range(self._next_index, self.num_frames):
+                if index not in self._pending:
+                    self._pending[index] = None
+            await self._flush()
+        if not self.frames_written:
+            raise RuntimeError("No frames were available to encode")
+
+        if self.encoder == "webp":
+            frames, self._buffered = self._buffered, []
+            return await self.pool.submit(encode_animated_webp, frames, self.fps, self.webp_quality)
+
+        try:
+            self._process.stdin.close()
+            stderr = await self._process.stderr.read()
+            if await self._process.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+            return await asyncio.to_thread(_read_file, self._output_path)
+        finally:
+            os.remove(self._output_path)
+
+    async def abort(self):
+        """Stop the encoder and discard any partial output"""
+        self._buffered = []
+        if self._process is not None and self._process.returncode is None:
+            self._process.kill()
+            await self._process.wait()
+        if self._output_path and os.path.exists(self._output_path):
+            os.remove(self._output_path)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()